@@ -12,7 +12,7 @@ import os
 import dask
 import gpm
 import numpy as np
-import pandas as pd
+import pyarrow as pa
 import xarray as xr
 from gpm.io.local import get_local_filepaths
 from gpm.utils.geospatial import extend_extent
@@ -31,6 +31,86 @@ dask.config.set({"distributed.worker.multiprocessing-method": "forkserver"})
 dask.config.set({"distributed.worker.use-file-locking": "False"})
 
 from dask.distributed import Client, LocalCluster  # noqa
+from distributed.utils import get_mp_context  # noqa
+
+# Variables to unstack into a column for each pmw_frequency or scan_mode
+UNSTACK_VARIABLES = {
+    "Tc": "pmw_frequency",
+    "sunGlintAngle": "scan_mode",
+    "incidenceAngle": "scan_mode",
+    "sunLocalTime": "scan_mode",
+    "Quality": "scan_mode",
+}
+
+# Quantization parameters of the variables optionally stored as int16
+# - Decoded values are obtained as: value = stored_value * scale_factor + add_offset
+# - Missing values are stored as nulls
+QUANTIZATION_SPECS = {
+    "Tc": {"scale_factor": 0.01, "add_offset": 200.0},
+    "incidenceAngle": {"scale_factor": 0.01, "add_offset": 0.0},
+    "sunGlintAngle": {"scale_factor": 0.01, "add_offset": 0.0},
+}
+
+
+def unstack_to_columns(da, dim, spatial_dims, suffix="_"):
+    """Unstack a DataArray dimension into a dictionary of 1D numpy arrays.
+
+    The column values are ordered as the rows of a dataframe indexed by ``spatial_dims``.
+    The columns are named ``"{name}{suffix}{dim_value}"`` as in ``gpm.unstack_dimension``.
+    """
+    labels = da[dim].to_numpy() if dim in da.coords else np.arange(da.sizes[dim])
+    # Reshape to (n_labels, n_rows) so that each column is a contiguous array
+    arr = da.transpose(dim, *spatial_dims).to_numpy().reshape(len(labels), -1)
+    return {f"{da.name}{suffix}{label}": arr[i] for i, label in enumerate(labels)}
+
+
+def dataset_to_columns(ds):
+    """Convert the dataset variables and coordinates into a dictionary of 1D numpy arrays.
+
+    The column values are ordered as the rows of ``ds.gpm.to_pandas_dataframe()``.
+    The dimensions and the CRS coordinates are not converted to columns.
+    """
+    spatial_dims = list(ds.dims)
+    shape = {dim: ds.sizes[dim] for dim in spatial_dims}
+    undesired_columns = [*spatial_dims, "crsWGS84", "spatial_ref"]
+    return {
+        name: var.set_dims(shape).transpose(*spatial_dims).to_numpy().ravel()
+        for name, var in ds.variables.items()
+        if name not in undesired_columns
+    }
+
+
+def quantize_column(values, scale_factor, add_offset):
+    """Quantize a float array into a int16 masked array.
+
+    Non-finite values and values outside the int16 range are masked.
+    """
+    with np.errstate(invalid="ignore"):
+        quantized = np.round((values - add_offset) / scale_factor)
+        is_invalid = ~np.isfinite(quantized) | (np.abs(quantized) > np.iinfo(np.int16).max)
+    quantized[is_invalid] = 0
+    return np.ma.masked_array(quantized.astype(np.int16), mask=is_invalid)
+
+
+def columns_to_table(dict_columns, dict_metadata):
+    """Create a pyarrow Table from 1D arrays, attaching the quantization parameters as field metadata."""
+    table = pa.Table.from_pydict(dict_columns)
+    fields = [
+        field.with_metadata({key: str(value) for key, value in dict_metadata[field.name].items()})
+        if field.name in dict_metadata
+        else field
+        for field in table.schema
+    ]
+    return pa.Table.from_arrays(table.columns, schema=pa.schema(fields))
+
+
+def scale_along_track_slice(isel_dict, ratio):
+    """Scale the along-track slice of an isel dictionary by an integer ratio."""
+    along_track_slice = isel_dict["along_track"]
+    isel_dict = isel_dict.copy()
+    isel_dict["along_track"] = slice(along_track_slice.start * ratio, along_track_slice.stop * ratio)
+    return isel_dict
+
 
 if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     ####----------------------------------------------------------------------.
@@ -38,21 +118,40 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     # Set environment variable to avoid HDF locking
     os.environ["HDF5_USE_FILE_LOCKING"] = "FALSE"
 
+    # Set environment variable to promptly return freed memory to the OS
+    # - Must be set before the (forkserver) worker processes are started
+    os.environ["MALLOC_TRIM_THRESHOLD_"] = "0"
+
     # Set number of workers
     # dask.delayed run n_workers*2 concurrent processes
     available_workers = int(os.cpu_count() / 2)
     num_workers = dask.config.get("num_workers", available_workers)
 
-    # Create dask.distributed local cluster
-    # --> Use multiprocessing to avoid netCDF multithreading locks !
-    cluster = LocalCluster(
-        n_workers=num_workers,
-        threads_per_worker=1,  # important to set to 1 to avoid netcdf locking !
-        processes=True,
-        silence_logs=logging.WARN,
-    )
+    # Connect to an existing cluster if the scheduler address is configured
+    # - i.e. with the DASK_SCHEDULER_ADDRESS environment variable
+    # - This avoids to start a new cluster at each script run
+    scheduler_address = dask.config.get("scheduler-address", None)
+    if scheduler_address is not None:
+        client = Client(scheduler_address)
+    else:
+        # Pre-import heavy modules in the forkserver process
+        # - Workers are forked from the forkserver and do not re-import them at every (re)start
+        # - get_mp_context() is called first, otherwise distributed overrides the preload list
+        mp_context = get_mp_context()
+        mp_context.set_forkserver_preload(
+            ["distributed", "numpy", "pandas", "pyarrow", "xarray", "netCDF4", "gpm", "satbucket"],
+        )
+
+        # Create dask.distributed local cluster
+        # --> Use multiprocessing to avoid netCDF multithreading locks !
+        cluster = LocalCluster(
+            n_workers=num_workers,
+            threads_per_worker=1,  # important to set to 1 to avoid netcdf locking !
+            processes=True,
+            silence_logs=logging.WARN,
+        )
 
-    client = Client(cluster)
+        client = Client(cluster)
     # client.ncores()
     # client.nthreads()
 
@@ -69,6 +168,8 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     # Define processing options
     parallel = True
     max_dask_total_tasks = 1000
+    batch_size = 8  # number of granules processed by each dask task
+    quantize = False  # whether to store Tc and angles as int16 (see QUANTIZATION_SPECS)
 
     # Define GPM product
     product = "1C-AMSR2-GCOMW1"
@@ -92,7 +193,7 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
                 "Quality",
                 #'FractionalGranuleNumber',
                 # 'SCaltitude',
-                "SClatitude",  # --> to determine orbit_mode
+                # "SClatitude",
                 # 'SClongitude',
                 "Tc",
                 "incidenceAngle",
@@ -101,53 +202,76 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
             ],
         ]
 
+        # Define scan modes of interest
+        scan_modes = ["S1", "S2", "S3", "S4", "S5"]
+
         # Define area of interest
         geographic_extent = [120, 145, -76, -64]
 
         # ---------------------------------------------------------------------.
-        #### Open the granules
+        #### Identify orbit slices over AOI !
+        # - Only the geolocation is opened to avoid reading the variables of
+        #   granules not intersecting the AOI
+        # - SClatitude is used to determine the orbit mode and is added to the table
         dt = gpm.open_granule_datatree(
             filepath=filepath,
-            variables=variables,
+            scan_modes=scan_modes,
+            variables=[["SClatitude"]],
             chunks=-1,
             cache=False,
         )
 
-        # Remove scan modes not needed
-        dt = dt.drop_nodes("S6")
-
-        # Identify orbit slices over AOI !
+        # Compute crop slices
+        # - Crop slices are computed once on the scan mode with the coarsest along-track sampling
+        # - Crop slices of the other scan modes are derived by scaling the along-track indices
+        n_scans = {scan_mode: dt[scan_mode].sizes["along_track"] for scan_mode in scan_modes}
+        scan_mode_coarsest = min(n_scans, key=n_scans.get)
         try:
-            scan_modes = ["S1", "S2", "S3", "S4", "S5"]
-            dict_isel_dicts = {
-                scan_mode: dt[scan_mode]
+            list_isel_dicts = (
+                dt[scan_mode_coarsest]
                 .to_dataset()
                 .gpm.get_crop_slices_by_extent(extend_extent(geographic_extent, padding=2))
-                for scan_mode in scan_modes
-            }
+            )
         except Exception:
+            dt.close()
             return None  # No intersecting data
 
-        # Check same size on each scan mode
-        n_slices_per_scan_mode = [len(v) for v in dict_isel_dicts.values()]
-        n_slices = np.unique(n_slices_per_scan_mode)
-        if len(n_slices) > 1:
-            raise ValueError("Different cropping area across scan modes")
-
         # Check slice size of at least size 5
-        dict_isel_dicts = {
-            scan_mode: [isel_dict for isel_dict in list_isel_dicts if get_slice_size(isel_dict["along_track"]) > 5]
-            for scan_mode, list_isel_dicts in dict_isel_dicts.items()
-        }
-        n_slices_per_scan_mode = [len(v) for v in dict_isel_dicts.values()]
-        n_slices = np.unique(n_slices_per_scan_mode)
-        if len(n_slices) > 1:
-            raise ValueError("In a single scan mode, a slice of size < 5 has been dropped.")
+        list_isel_dicts = [isel_dict for isel_dict in list_isel_dicts if get_slice_size(isel_dict["along_track"]) > 5]
+        n_slices = len(list_isel_dicts)
+
+        # Define the crop slices of each scan mode
+        dict_isel_dicts = {}
+        for scan_mode in scan_modes:
+            ratio, remainder = divmod(n_scans[scan_mode], n_scans[scan_mode_coarsest])
+            if remainder != 0:
+                raise ValueError(f"{scan_mode} along-track size is not a multiple of the {scan_mode_coarsest} one.")
+            dict_isel_dicts[scan_mode] = [scale_along_track_slice(isel_dict, ratio) for isel_dict in list_isel_dicts]
+
+        # Compute the orbit mode of the reference scan mode once for the whole granule
+        scan_mode_reference = scan_modes[-1]
+        orbit_mode = get_orbit_mode(dt[scan_mode_reference].to_dataset()).to_numpy()
+        sc_latitude = dt[scan_mode_reference]["SClatitude"].to_numpy()
+
+        # Close geolocation file connection
+        dt.close()
 
-        n_slices = n_slices[0]
+        # Skip the granule if no valid slice
+        if n_slices == 0:
+            return None
 
-        # Create dataframe over each orbit slice
-        list_df = []
+        # ---------------------------------------------------------------------.
+        #### Open the granules
+        dt = gpm.open_granule_datatree(
+            filepath=filepath,
+            scan_modes=scan_modes,
+            variables=variables,
+            chunks=-1,
+            cache=False,
+        )
+
+        # Create pyarrow Table over each orbit slice
+        list_tables = []
 
         for i in range(n_slices):
 
@@ -163,37 +287,44 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
             dt_cropped = xr.DataTree.from_dict(dict_ds)
 
             # Remap to common grid
-            ds = dt_cropped.gpm.regrid_pmw_l1(scan_mode_reference=scan_modes[-1])
-
-            # Add orbit mode
-            ds = ds.assign_coords({"orbit_mode": get_orbit_mode(ds)})
+            ds = dt_cropped.gpm.regrid_pmw_l1(scan_mode_reference=scan_mode_reference)
 
-            # Unstack variables with pmw_frequency and scan_mode dimension
-            ds.update(ds["Tc"].gpm.unstack_dimension(dim="pmw_frequency", suffix="_"))
-            ds.update(ds["sunGlintAngle"].gpm.unstack_dimension(dim="scan_mode", suffix="_"))
-            ds.update(ds["incidenceAngle"].gpm.unstack_dimension(dim="scan_mode", suffix="_"))
-            ds.update(ds["sunLocalTime"].gpm.unstack_dimension(dim="scan_mode", suffix="_"))
-            ds.update(ds["Quality"].gpm.unstack_dimension(dim="scan_mode", suffix="_"))
-            ds = ds.drop_vars(["Tc", "sunLocalTime", "Quality", "sunGlintAngle", "incidenceAngle"])
+            # Add orbit mode and satellite latitude
+            along_track_slice = dict_isel_dicts[scan_mode_reference][i]["along_track"]
+            ds = ds.assign_coords({"orbit_mode": ("along_track", orbit_mode[along_track_slice])})
+            ds["SClatitude"] = ("along_track", sc_latitude[along_track_slice])
 
             # -----------------------------------------------------------------.
             #### Read data in memory
             ds = ds.compute()
 
             # -----------------------------------------------------------------.
-            #### Convert to pandas dataframe
-            df = ds.gpm.to_pandas_dataframe()
-            list_df.append(df)
+            #### Convert to pyarrow Table
+            # - Variables with pmw_frequency and scan_mode dimension are unstacked with numpy
+            # - The other variables and coordinates are flattened with numpy
+            ds_spatial = ds.drop_dims(list(set(UNSTACK_VARIABLES.values())))
+            spatial_dims = list(ds_spatial.dims)
+            # - If quantize=True, the variables in QUANTIZATION_SPECS are stored as int16
+            dict_columns = dataset_to_columns(ds_spatial)
+            dict_metadata = {}
+            for var, dim in UNSTACK_VARIABLES.items():
+                dict_var_columns = unstack_to_columns(ds[var], dim=dim, spatial_dims=spatial_dims)
+                if quantize and var in QUANTIZATION_SPECS:
+                    specs = QUANTIZATION_SPECS[var]
+                    dict_var_columns = {name: quantize_column(arr, **specs) for name, arr in dict_var_columns.items()}
+                    dict_metadata.update(dict.fromkeys(dict_var_columns, specs))
+                dict_columns.update(dict_var_columns)
+            list_tables.append(columns_to_table(dict_columns, dict_metadata))
 
         # ---------------------------------------------------------------------.
         # Concatenate slices
-        df = pd.concat(list_df)
+        table = pa.concat_tables(list_tables)
 
         # ---------------------------------------------------------------------.
         # Close file connection
         dt.close()
         ds.close()
-        return df
+        return table
 
     ####----------------------------------------------------------------------.
     #### Compute Granule Buckets
@@ -210,6 +341,7 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
         parallel=True,
         max_concurrent_tasks=None,
         max_dask_total_tasks=max_dask_total_tasks,
+        batch_size=batch_size,
         # Writer kwargs
         **writer_kwargs,
     )
@@ -1,6 +1,6 @@
 import gpm  # noqa
 import matplotlib.pyplot as plt
-import xarray as xr
+import numpy as np
 import satbucket
 from satbucket.analysis import split_by_overpass, overpass_to_dataset
 
@@ -17,14 +17,17 @@ df = satbucket.read(
     use_pyarrow=False,  # use rust parquet reader
     extent=extent,
     parallel="auto",  # "row_groups", "columns"
-    backend="polars",  # "pandas"
+    backend="polars_lazy",  # "polars", "pandas"
 )
 
+# Sort by time within the lazy query and read data into memory
+# - The spatial filtering, row groups pruning and sorting are executed by the polars query engine
+df = df.sort("time").collect()
+
 ###------------------------------------------------------------------------.
 #### Group data by satellite overpass
 n_minimum_pixels = 1200
 n_overpass = 200
-df = df.sort("time")
 list_df_overpass = split_by_overpass(df, interval=None, max_overpass=n_overpass)
 list_df_overpass = [d for d in list_df_overpass if len(d) > n_minimum_pixels]
 list_ds_overpass = [
@@ -48,15 +51,22 @@ ds_aoi = satbucket.LonLatPartitioning(size=0.02, extent=extent).dataset_grid
 # ds_swath_remapped = ds_swath[["CHANNEL_1"]].gpm.remap_on(ds_aoi)
 
 # Create stack of overpass
-list_ds_overpass = [ds_swath.assign_coords({"time": ds_swath["time"].values[0]}) for ds_swath in list_ds_overpass]
-list_ds_stack = [ds_swath.chunk().gpm.remap_on(ds_aoi) for ds_swath in list_ds_overpass]
-
-ds_stack = xr.concat(list_ds_stack, dim="time")
+# - Only the variable of interest is remapped
+# - The overpasses are remapped in memory (without building a dask graph per overpass)
+# - The remapped arrays are written into a pre-allocated (time, y, x) array
+variable = "CHANNEL_1"
+list_time = [ds_swath["time"].to_numpy()[0] for ds_swath in list_ds_overpass]
+da_template = list_ds_overpass[0][[variable]].gpm.remap_on(ds_aoi)[variable].drop_vars("time", errors="ignore")
+arr_stack = np.empty((len(list_ds_overpass), *da_template.shape), dtype=da_template.dtype)
+arr_stack[0] = da_template.to_numpy()
+for i, ds_swath in enumerate(list_ds_overpass[1:], start=1):
+    arr_stack[i] = ds_swath[[variable]].gpm.remap_on(ds_aoi)[variable].to_numpy()
+da_stack = da_template.expand_dims(time=list_time).copy(data=arr_stack)
 
 ###------------------------------------------------------------------------.
 ### Display temporal evolution
 # - Optionally forward fill
-da = ds_stack["CHANNEL_1"].ffill(dim="time").compute()
+da = da_stack.ffill(dim="time")
 
 # Display stack overpass
 for i in range(da["time"].size):
@@ -7,10 +7,13 @@
 ####----------------------------------------------------------------------.
 import logging
 import os
+import warnings
 
 import dask
 import gpm
+import numpy as np
 from gpm.io.local import get_local_filepaths
+from gpm.utils.manipulations import get_bright_band_mask, get_liquid_phase_mask, get_solid_phase_mask
 
 from satbucket import LonLatPartitioning, write_granules_bucket
 
@@ -19,6 +22,104 @@ dask.config.set({"distributed.worker.multiprocessing-method": "forkserver"})
 dask.config.set({"distributed.worker.use-file-locking": "False"})
 
 from dask.distributed import Client, LocalCluster  # noqa
+from distributed.utils import get_mp_context  # noqa
+
+# Number of beams processed at once by the column reductions
+BLOCK_SIZE = 1024
+
+
+def _compute_block_statistics(arr):
+    """Compute the NaN-aware maximum, mean and standard deviation along the last axis of a 2D block."""
+    arr = arr.astype(np.float64)
+    is_valid = ~np.isnan(arr)
+    count = is_valid.sum(axis=-1)
+    arr_filled = np.where(is_valid, arr, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = arr_filled.sum(axis=-1) / count
+        # Subtract the mean before squaring to avoid the cancellation of E[x**2] - E[x]**2
+        residuals = np.where(is_valid, arr - mean[:, np.newaxis], 0)
+        variance = (residuals**2).sum(axis=-1) / count
+    std = np.sqrt(variance)
+    maximum = np.where(is_valid, arr, -np.inf).max(axis=-1)
+    maximum[count == 0] = np.nan
+    return maximum, mean, std
+
+
+def compute_column_statistics(da, dim="range", block_size=BLOCK_SIZE):
+    """Compute the NaN-aware maximum, mean and standard deviation along a dimension.
+
+    The statistics are derived from the sum and the count of the valid values, and
+    from the sum of squared deviations from the mean, avoiding the sorting required
+    by the median.
+    The columns are processed by blocks of ``block_size`` beams to keep the
+    temporary arrays small.
+    """
+    da = da.transpose(..., dim)
+    arr = da.to_numpy()
+    arr_2d = arr.reshape(-1, arr.shape[-1])
+    n_columns = arr_2d.shape[0]
+    results = tuple(np.empty(n_columns, dtype=da.dtype) for _ in range(3))
+    for start in range(0, n_columns, block_size):
+        block_slice = slice(start, start + block_size)
+        for values, block_values in zip(results, _compute_block_statistics(arr_2d[block_slice]), strict=True):
+            values[block_slice] = block_values
+    # Wrap results into DataArrays with the original coordinates
+    da_template = da.isel({dim: 0}, drop=True)
+    return tuple(da_template.copy(data=values.reshape(arr.shape[:-1])) for values in results)
+
+
+def compute_column_maxima(ds, dim="range", block_size=BLOCK_SIZE):
+    """Compute the column maximum of air temperature and precipitation rate (also by phase).
+
+    The air temperature and precipitation rate arrays are extracted once and the
+    liquid and solid phase masks are derived from the same air temperature block.
+    The columns are processed by blocks of ``block_size`` beams.
+    """
+    da_precip_rate = ds["precipRate"].transpose(..., dim)
+    precip_rate = da_precip_rate.to_numpy()
+    air_temperature = ds["airTemperature"].transpose(*da_precip_rate.dims).to_numpy()
+    n_range = precip_rate.shape[-1]
+    precip_rate = precip_rate.reshape(-1, n_range)
+    air_temperature = air_temperature.reshape(-1, n_range)
+    n_columns = precip_rate.shape[0]
+    dict_maxima = {
+        "airTemperatureMax": np.empty(n_columns, dtype=air_temperature.dtype),
+        "precipRateMax": np.empty(n_columns, dtype=precip_rate.dtype),
+        "precipRateSolid_Max": np.empty(n_columns, dtype=precip_rate.dtype),
+        "precipRateLiquid_Max": np.empty(n_columns, dtype=precip_rate.dtype),
+    }
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # All-NaN slice encountered
+        for start in range(0, n_columns, block_size):
+            block_slice = slice(start, start + block_size)
+            block_temperature = air_temperature[block_slice]
+            block_precip_rate = precip_rate[block_slice]
+            dict_maxima["airTemperatureMax"][block_slice] = np.nanmax(block_temperature, axis=-1)
+            dict_maxima["precipRateMax"][block_slice] = np.nanmax(block_precip_rate, axis=-1)
+            dict_maxima["precipRateSolid_Max"][block_slice] = np.nanmax(
+                np.where(block_temperature < 273.15, block_precip_rate, np.nan),
+                axis=-1,
+            )
+            dict_maxima["precipRateLiquid_Max"][block_slice] = np.nanmax(
+                np.where(block_temperature > 273.15, block_precip_rate, np.nan),
+                axis=-1,
+            )
+    # Wrap results into DataArrays with the original coordinates
+    da_template = da_precip_rate.isel({dim: 0}, drop=True)
+    shape = da_template.shape
+    return {name: da_template.copy(data=values.reshape(shape)) for name, values in dict_maxima.items()}
+
+
+def get_echo_height_range(da_z, da_height, threshold, da_mask=None):
+    """Return the maximum and minimum height of the bins with reflectivity above a positive threshold.
+
+    Equivalent to the height range used by the gpm ``EchoDepth`` and ``EchoTopHeight`` retrievals.
+    """
+    da_height_masked = da_height.where(da_z > threshold)
+    if da_mask is not None:
+        da_height_masked = da_height_masked.where(da_mask)
+    return da_height_masked.max(dim="range"), da_height_masked.min(dim="range")
+
 
 if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     ####----------------------------------------------------------------------.
@@ -26,21 +127,40 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     # Set environment variable to avoid HDF locking
     os.environ["HDF5_USE_FILE_LOCKING"] = "FALSE"
 
+    # Set environment variable to promptly return freed memory to the OS
+    # - Must be set before the (forkserver) worker processes are started
+    os.environ["MALLOC_TRIM_THRESHOLD_"] = "0"
+
     # Set number of workers
     # dask.delayed run n_workers*2 concurrent processes
     available_workers = int(os.cpu_count() / 2)
     num_workers = dask.config.get("num_workers", available_workers)
 
-    # Create dask.distributed local cluster
-    # --> Use multiprocessing to avoid netCDF multithreading locks !
-    cluster = LocalCluster(
-        n_workers=num_workers,
-        threads_per_worker=1,  # important to set to 1 to avoid netcdf locking !
-        processes=True,
-        silence_logs=logging.WARN,
-    )
+    # Connect to an existing cluster if the scheduler address is configured
+    # - i.e. with the DASK_SCHEDULER_ADDRESS environment variable
+    # - This avoids to start a new cluster at each script run
+    scheduler_address = dask.config.get("scheduler-address", None)
+    if scheduler_address is not None:
+        client = Client(scheduler_address)
+    else:
+        # Pre-import heavy modules in the forkserver process
+        # - Workers are forked from the forkserver and do not re-import them at every (re)start
+        # - get_mp_context() is called first, otherwise distributed overrides the preload list
+        mp_context = get_mp_context()
+        mp_context.set_forkserver_preload(
+            ["distributed", "numpy", "pandas", "pyarrow", "xarray", "netCDF4", "gpm", "satbucket"],
+        )
 
-    client = Client(cluster)
+        # Create dask.distributed local cluster
+        # --> Use multiprocessing to avoid netCDF multithreading locks !
+        cluster = LocalCluster(
+            n_workers=num_workers,
+            threads_per_worker=1,  # important to set to 1 to avoid netcdf locking !
+            processes=True,
+            silence_logs=logging.WARN,
+        )
+
+        client = Client(cluster)
     # client.ncores()
     # client.nthreads()
 
@@ -57,6 +177,7 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     # Define processing options
     parallel = True
     max_dask_total_tasks = 1000
+    batch_size = 8  # number of granules processed by each dask task
 
     # Define GPM product
     product = "2A-DPR"
@@ -137,6 +258,19 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
 
         ds = gpm.open_granule_dataset(filepath, **open_granule_kwargs)
 
+        # Read first only the precipitation flag
+        # - Identify the scans with at least one precipitating beam
+        # - Skip the granule if there is no precipitation
+        is_precip_scan = (ds["flagPrecip"].compute() > 0).any(dim="cross_track").to_numpy()
+        if not is_precip_scan.any():
+            ds.close()
+            return None
+
+        # Discard scans without precipitation before reading the other variables
+        # - The selection is pushed down to the lazy arrays and avoid loading
+        #   the 3D variables (i.e. zFactorFinal, precipRate, paramDSD) of dry scans
+        ds = ds.isel(along_track=np.where(is_precip_scan)[0])
+
         # Precompute the enture granules
         # - Faster than compute after stacking because of the very small chunking of native HDF files
         ds = ds.compute()
@@ -161,83 +295,88 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
         ds = ds_beam
 
         # Compute variables for both frequencies: Ku and Ka
+        # - The new variables are collected in a dictionary and added to the dataset at once
+        #   to avoid aligning and merging the dataset at every assignment
+        dict_vars = {}
         for band in ["Ku", "Ka"]:
             ds_f = ds.sel({"radar_frequency": band})
-            ds[f"dataQuality_{band}"] = ds_f["dataQuality"]
+            dict_vars[f"dataQuality_{band}"] = ds_f["dataQuality"]
             for var in ds.gpm.frequency_variables:
                 # Standard variables
-                ds[f"{var}_{band}"] = ds_f[var]
+                dict_vars[f"{var}_{band}"] = ds_f[var]
 
             # Custom variables
-            # - REFC takes 2-3 seconds each on full granule !
-            # - EchoDepth takes 5-6 seconds each on full granule !
-            ds[f"heightRealSurface_{band}"] = ds_f.gpm.get_height_at_bin(bins=ds_f["binRealSurface"])
-            ds[f"REFC_{band}"] = ds_f.gpm.retrieve("REFC")
-            ds[f"REFC_without_bb_{band}"] = ds_f.gpm.retrieve("REFC", mask_bright_band=True)
-            ds[f"REFC_liquid_{band}"] = ds_f.gpm.retrieve("REFC", mask_solid_phase=True)
-            ds[f"REFC_solid_{band}"] = ds_f.gpm.retrieve("REFC", mask_liquid_phase=True)
-            ds[f"REFC_solid_without_bb_{band}"] = ds_f.gpm.retrieve(
-                "REFC",
-                mask_liquid_phase=True,
-                mask_bright_band=True,
-            )
-            ds[f"REFC_liquid_without_bb_{band}"] = ds_f.gpm.retrieve(
-                "REFC",
-                mask_solid_phase=True,
-                mask_bright_band=True,
-            )
-            ds[f"REFCH_{band}"] = ds_f.gpm.retrieve("REFCH")
-            ds[f"EchoDepth30dBZ_{band}"] = ds_f.gpm.retrieve("EchoDepth", threshold=30)
-            ds[f"EchoDepth30dBZ_solid_phase_{band}"] = ds_f.gpm.retrieve(
-                "EchoDepth",
-                threshold=30,
-                mask_liquid_phase=True,
-            )
+            # - The reflectivity, bright band and phase masks are computed once
+            #   and shared across the REFC and EchoDepth retrievals
+            # - The masking is the same of ds_f.gpm.retrieve("REFC", ...) and ds_f.gpm.retrieve("EchoDepth", ...)
+            dict_vars[f"heightRealSurface_{band}"] = ds_f.gpm.get_height_at_bin(bins=ds_f["binRealSurface"])
+            da_z = ds_f["zFactorFinal"]
+            da_z_without_bb = da_z.where(~get_bright_band_mask(ds_f))
+            da_liquid_phase_mask = get_liquid_phase_mask(ds_f)
+            da_solid_phase_mask = get_solid_phase_mask(ds_f)
+            dict_vars[f"REFC_{band}"] = da_z.max(dim="range")
+            dict_vars[f"REFC_without_bb_{band}"] = da_z_without_bb.max(dim="range")
+            # - retrieve("REFC", mask_solid_phase=True) keeps the bins where the solid phase mask is True
+            dict_vars[f"REFC_liquid_{band}"] = da_z.where(da_solid_phase_mask).max(dim="range")
+            dict_vars[f"REFC_solid_{band}"] = da_z.where(da_liquid_phase_mask).max(dim="range")
+            dict_vars[f"REFC_solid_without_bb_{band}"] = da_z_without_bb.where(da_liquid_phase_mask).max(dim="range")
+            dict_vars[f"REFC_liquid_without_bb_{band}"] = da_z_without_bb.where(da_solid_phase_mask).max(dim="range")
+            dict_vars[f"REFCH_{band}"] = ds_f.gpm.retrieve("REFCH")
+            for da_mask, suffix in [(None, ""), (~da_liquid_phase_mask, "_solid_phase")]:
+                da_max_height, da_min_height = get_echo_height_range(
+                    da_z=da_z,
+                    da_height=ds_f["height"],
+                    threshold=30,
+                    da_mask=da_mask,
+                )
+                dict_vars[f"EchoDepth30dBZ{suffix}_{band}"] = da_max_height - da_min_height
 
         # Compute additional variables
-        ds["precipitationType"] = ds.gpm.retrieve("flagPrecipitationType", method="major_rain_type")
-        ds["heightClutterFreeBottom"] = ds.gpm.retrieve("heightClutterFreeBottom")
-
-        ds["EchoDepth45dBZ"] = ds.gpm.retrieve("EchoDepth", threshold=45)
-        ds["EchoDepth50dBZ"] = ds.gpm.retrieve("EchoDepth", threshold=50)
-
-        ds["EchoDepth30dBZ_solid_phase"] = ds.gpm.retrieve("EchoDepth", threshold=30, mask_liquid_phase=True)
-        ds["EchoDepth40dBZ_solid_phase"] = ds.gpm.retrieve("EchoDepth", threshold=40, mask_liquid_phase=True)
-        ds["EchoDepth45dBZ_solid_phase"] = ds.gpm.retrieve("EchoDepth", threshold=45, mask_liquid_phase=True)
-        ds["EchoDepth50dBZ_solid_phase"] = ds.gpm.retrieve("EchoDepth", threshold=50, mask_liquid_phase=True)
-
-        ds["EchoTopHeight30dBZ"] = ds.gpm.retrieve("EchoTopHeight", threshold=30)
-        ds["EchoTopHeight40dBZ"] = ds.gpm.retrieve("EchoTopHeight", threshold=40)
-        ds["EchoTopHeight50dBZ"] = ds.gpm.retrieve("EchoTopHeight", threshold=50)
-        ds["EchoTopHeight60dBZ"] = ds.gpm.retrieve("EchoTopHeight", threshold=60)
-
-        # Take maximum temperature
-        ds["airTemperatureMax"] = ds["airTemperature"].max(dim="range")
-        ds["precipRateMax"] = ds["precipRate"].max(dim="range")
+        dict_vars["precipitationType"] = ds.gpm.retrieve("flagPrecipitationType", method="major_rain_type")
+        dict_vars["heightClutterFreeBottom"] = ds.gpm.retrieve("heightClutterFreeBottom")
+
+        # Compute Ku-band echo depths and echo top heights
+        # - The thresholded heights are computed once and shared across the retrievals
+        ds_ku = ds.sel({"radar_frequency": "Ku"})
+        da_solid_phase_mask = ~get_liquid_phase_mask(ds_ku)
+        for threshold in [30, 40, 45, 50, 60]:
+            da_max_height, da_min_height = get_echo_height_range(
+                da_z=ds_ku["zFactorFinal"],
+                da_height=ds_ku["height"],
+                threshold=threshold,
+            )
+            if threshold in [30, 40, 50, 60]:
+                dict_vars[f"EchoTopHeight{threshold}dBZ"] = da_max_height
+            if threshold in [45, 50]:
+                dict_vars[f"EchoDepth{threshold}dBZ"] = da_max_height - da_min_height
+            if threshold in [30, 40, 45, 50]:
+                da_max_height, da_min_height = get_echo_height_range(
+                    da_z=ds_ku["zFactorFinal"],
+                    da_height=ds_ku["height"],
+                    threshold=threshold,
+                    da_mask=da_solid_phase_mask,
+                )
+                dict_vars[f"EchoDepth{threshold}dBZ_solid_phase"] = da_max_height - da_min_height
+
+        # Take maximum temperature and precipitation rate (also for the solid and liquid phase)
+        dict_vars.update(compute_column_maxima(ds, dim="range"))
 
         # Take DSD parameters statistics across column
-        ds["Nw_Max"] = ds["Nw"].max(dim="range")
-        ds["Nw_Mean"] = ds["Nw"].median(dim="range")  # 2 secs
-        ds["Nw_Std"] = ds["Nw"].std(dim="range", skipna=True)
-        ds["dBNw_Max"] = ds["dBNw"].max(dim="range")
-        ds["dBNw_Mean"] = ds["dBNw"].median(dim="range")  # 2 secs
-        ds["dBNw_Std"] = ds["dBNw"].std(dim="range", skipna=True)
-        ds["Dm_Max"] = ds["Dm"].max(dim="range")
-        ds["Dm_Mean"] = ds["Dm"].median(dim="range")  # 2 secs
-        ds["Dm_Std"] = ds["Dm"].std(dim="range", skipna=True)
+        # - Max, Mean and Std are computed in a single pass for each variable
+        for var in ["Nw", "dBNw", "Dm"]:
+            dict_vars[f"{var}_Max"], dict_vars[f"{var}_Mean"], dict_vars[f"{var}_Std"] = compute_column_statistics(
+                ds[var],
+                dim="range",
+            )
 
         # Extract surface DSD variables
         surface_vars = ["Nw", "dBNw", "Dm"]
         ds_surface = ds[[*surface_vars]].gpm.slice_range_at_bin(ds["binClutterFreeBottom"])
         for var in surface_vars:
-            ds[f"{var}NearSurface"] = ds_surface[var]
+            dict_vars[f"{var}NearSurface"] = ds_surface[var]
 
-        # ---------------------------------------------------------------------.
-        # Compute statistics of solid and liquid phase
-        da_liquid_precip_rate = ds["precipRate"].where(ds["airTemperature"] > 273.15)
-        da_solid_precip_rate = ds["precipRate"].where(ds["airTemperature"] < 273.15)
-        ds["precipRateSolid_Max"] = da_solid_precip_rate.max(dim="range")
-        ds["precipRateLiquid_Max"] = da_liquid_precip_rate.max(dim="range")
+        # Add the custom variables to the dataset
+        ds = ds.assign(dict_vars)
 
         # ---------------------------------------------------------------------.
         # Add Hail Indicators
@@ -303,6 +442,7 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
         parallel=True,
         max_concurrent_tasks=None,
         max_dask_total_tasks=max_dask_total_tasks,
+        batch_size=batch_size,
         # Writer kwargs
         **writer_kwargs,
     )
@@ -12,8 +12,9 @@ import os
 
 import dask
 import gpm
+import pyarrow as pa
 import xarray as xr
-from gpm.io.find import find_associated_filepath
+from gpm.io.info import get_granule_from_filepaths
 from gpm.io.local import get_local_filepaths
 from gpm.utils.orbit import get_orbit_mode
 
@@ -29,6 +30,24 @@ dask.config.set({"distributed.worker.multiprocessing-method": "forkserver"})
 dask.config.set({"distributed.worker.use-file-locking": "False"})
 
 from dask.distributed import Client, LocalCluster  # noqa
+from distributed.utils import get_mp_context  # noqa
+
+
+def dataset_to_columns(ds):
+    """Convert the dataset variables and coordinates into a dictionary of 1D numpy arrays.
+
+    The column values are ordered as the rows of ``ds.gpm.to_pandas_dataframe()``.
+    The dimensions and the CRS coordinates are not converted to columns.
+    """
+    spatial_dims = list(ds.dims)
+    shape = {dim: ds.sizes[dim] for dim in spatial_dims}
+    undesired_columns = [*spatial_dims, "crsWGS84", "spatial_ref"]
+    return {
+        name: var.set_dims(shape).transpose(*spatial_dims).to_numpy().ravel()
+        for name, var in ds.variables.items()
+        if name not in undesired_columns
+    }
+
 
 if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     ####----------------------------------------------------------------------.
@@ -36,21 +55,40 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     # Set environment variable to avoid HDF locking
     os.environ["HDF5_USE_FILE_LOCKING"] = "FALSE"
 
+    # Set environment variable to promptly return freed memory to the OS
+    # - Must be set before the (forkserver) worker processes are started
+    os.environ["MALLOC_TRIM_THRESHOLD_"] = "0"
+
     # Set number of workers
     # dask.delayed run n_workers*2 concurrent processes
     available_workers = int(os.cpu_count() / 2)
     num_workers = dask.config.get("num_workers", available_workers)
 
-    # Create dask.distributed local cluster
-    # --> Use multiprocessing to avoid netCDF multithreading locks !
-    cluster = LocalCluster(
-        n_workers=num_workers,
-        threads_per_worker=1,  # important to set to 1 to avoid netcdf locking !
-        processes=True,
-        silence_logs=logging.WARN,
-    )
+    # Connect to an existing cluster if the scheduler address is configured
+    # - i.e. with the DASK_SCHEDULER_ADDRESS environment variable
+    # - This avoids to start a new cluster at each script run
+    scheduler_address = dask.config.get("scheduler-address", None)
+    if scheduler_address is not None:
+        client = Client(scheduler_address)
+    else:
+        # Pre-import heavy modules in the forkserver process
+        # - Workers are forked from the forkserver and do not re-import them at every (re)start
+        # - get_mp_context() is called first, otherwise distributed overrides the preload list
+        mp_context = get_mp_context()
+        mp_context.set_forkserver_preload(
+            ["distributed", "numpy", "pandas", "pyarrow", "xarray", "netCDF4", "gpm", "satbucket"],
+        )
 
-    client = Client(cluster)
+        # Create dask.distributed local cluster
+        # --> Use multiprocessing to avoid netCDF multithreading locks !
+        cluster = LocalCluster(
+            n_workers=num_workers,
+            threads_per_worker=1,  # important to set to 1 to avoid netcdf locking !
+            processes=True,
+            silence_logs=logging.WARN,
+        )
+
+        client = Client(cluster)
     # client.ncores()
     # client.nthreads()
 
@@ -67,6 +105,7 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     # Define processing options
     parallel = True
     max_dask_total_tasks = 1000
+    batch_size = 8  # number of granules processed by each dask task
 
     # Define GPM product
     product = "1C-GMI-R"
@@ -80,11 +119,20 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
 
     # filepath = filepaths[0]
 
+    #### List the 2A-GMI-CLIM granules associated to the 1C-GMI-R granules
+    # - The 2A-GMI-CLIM files are listed once instead of searched for each 1C-GMI-R granule
+    # - The granules are matched by granule number
+    filepaths_2a = get_local_filepaths(product="2A-GMI-CLIM", product_type=product_type, version=version)
+    dict_filepaths_2a = dict(zip(get_granule_from_filepaths(filepaths_2a), filepaths_2a, strict=True))
+
     ####----------------------------------------------------------------------.
     #### Define the granule filepath to dataframe conversion function
     def create_dataframe_from_granule(filepath):
         #### Retrieve the 2A-GMI-CLIM granule associated to the 1C-GMI-R product
-        filepath_2a = find_associated_filepath(filepath, product="2A-GMI-CLIM", version=7)
+        granule_id = get_granule_from_filepaths([filepath])[0]
+        if granule_id not in dict_filepaths_2a:
+            raise ValueError(f"The 2A-GMI-CLIM product associated to {os.path.basename(filepath)} is not available.")
+        filepath_2a = dict_filepaths_2a[granule_id]
 
         # ---------------------------------------------------------------------.
         #### Define the variables of interest
@@ -145,17 +193,28 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
         #### Open the granules
         # Open scan S1 (low frequency channels) and S2 (high frequency channels)
         # - 1C-GMI-R is already collocated channels across S1 and S2
+        # - Data are read directly in memory (chunks=None) to avoid building a dask graph
         dt = gpm.open_granule_datatree(
             filepath=filepath,
             variables=variables_1c,
-            chunks=-1,
+            chunks=None,
             cache=False,
         )
         ds_s1 = dt["S1"].to_dataset()
+
+        # Remove 1C-R S2 variables and coordinates already available in S1
+        # - Dropping them before the merge avoids to process duplicated variables
+        # - Quality is a coordinate, but it differs between S1 and S2 and must be kept
         ds_s2 = dt["S2"].to_dataset()
+        ds_s2 = ds_s2.drop_vars(
+            ["lon", "lat", "time", "SCorientation", "sunLocalTime", "SClatitude"],
+            errors="ignore",
+        )
 
         # Open 2A-CLIM product
-        ds_2a = gpm.open_granule_dataset(filepath_2a, variables=variables_2a, chunks=-1, cache=False)
+        # - The coordinates are already available in 1C-R S1
+        ds_2a = gpm.open_granule_dataset(filepath_2a, variables=variables_2a, chunks=None, cache=False)
+        ds_2a = ds_2a.reset_coords(drop=True)
 
         # ---------------------------------------------------------------------.
         #### Concatenate together the scan modes of 1C-GMI-R
@@ -184,36 +243,30 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
             },
         ).squeeze()
 
-        # Concat 1C-R together
-        ds_s2 = ds_s2.drop_vars(["lon", "lat", "sunLocalTime", "SCorientation", "SClatitude"])
-        ds_1c = xr.merge((ds_s1, ds_s2))
-
         # ---------------------------------------------------------------------.
         #### Unstack the Tc pmw_frequency dimension
-        # Add a Tc variable for each frequency
-        for i, freq in enumerate(ds_1c["pmw_frequency"].values):
-            # Select the data for the current frequency
-            da_freq = ds_1c["Tc"].isel({"pmw_frequency": i})
-            # Create a variable name based on the frequency
-            var_name = f"Tc_{freq}"
-            # Add this data array as a variable to the dataset
-            ds_1c[var_name] = da_freq
-        ds_1c = ds_1c.drop_vars("Tc")
+        # Add a Tc variable for each frequency of each scan mode
+        # - The pmw_frequency dimension is split into variables in a single pass
+        list_ds_1c = []
+        for ds_scan_mode in [ds_s1, ds_s2]:
+            ds_tc = ds_scan_mode["Tc"].to_dataset(dim="pmw_frequency")
+            ds_tc = ds_tc.rename_vars({freq: f"Tc_{freq}" for freq in ds_tc.data_vars})
+            list_ds_1c.append(ds_scan_mode.drop_vars(["Tc", "pmw_frequency"]).assign(ds_tc.data_vars))
 
         # ---------------------------------------------------------------------.
         #### Combine all data together
-        ds = xr.merge((ds_1c, ds_2a))
-
-        # ---------------------------------------------------------------------.
-        #### Read data in memory
-        ds = ds.compute()
+        # - The 1C-R scan modes and the 2A-CLIM product share the same footprints
+        # - A single merge is performed without aligning and comparing the coordinates
+        # - The coordinates of the 1C-R S1 scan mode are used
+        ds = xr.merge([*list_ds_1c, ds_2a], compat="override", join="override")
 
         # ---------------------------------------------------------------------.
-        #### Convert to pandas dataframe
-        df = ds.gpm.to_pandas_dataframe()
+        #### Convert to pyarrow table
+        # - The 1D column arrays are directly converted to arrow (without a pandas intermediate)
+        table = pa.Table.from_pydict(dataset_to_columns(ds))
 
         # ---------------------------------------------------------------------.
-        return df
+        return table
 
     ####----------------------------------------------------------------------.
     #### Compute Granule Buckets
@@ -230,6 +283,7 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
         parallel=True,
         max_concurrent_tasks=None,
         max_dask_total_tasks=max_dask_total_tasks,
+        batch_size=batch_size,
         # Writer kwargs
         **writer_kwargs,
     )
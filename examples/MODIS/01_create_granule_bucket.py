@@ -17,6 +17,7 @@ dask.config.set({"distributed.worker.multiprocessing-method": "forkserver"})
 dask.config.set({"distributed.worker.use-file-locking": "False"})
 
 from dask.distributed import Client, LocalCluster  # noqa
+from distributed.utils import get_mp_context  # noqa
 
 if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     ####----------------------------------------------------------------------.
@@ -24,21 +25,38 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     # Set environment variable to avoid HDF locking
     os.environ["HDF5_USE_FILE_LOCKING"] = "FALSE"
 
+    # Set environment variable to promptly return freed memory to the OS
+    # - Must be set before the (forkserver) worker processes are started
+    os.environ["MALLOC_TRIM_THRESHOLD_"] = "0"
+
     # Set number of workers
     # dask.delayed run n_workers*2 concurrent processes
     available_workers = int(os.cpu_count() / 2)
     num_workers = dask.config.get("num_workers", available_workers)
 
-    # Create dask.distributed local cluster
-    # --> Use multiprocessing to avoid netCDF multithreading locks !
-    cluster = LocalCluster(
-        n_workers=num_workers,
-        threads_per_worker=1,  # important to set to 1 to avoid netcdf locking !
-        processes=True,
-        silence_logs=logging.WARN,
-    )
-
-    client = Client(cluster)
+    # Connect to an existing cluster if the scheduler address is configured
+    # - i.e. with the DASK_SCHEDULER_ADDRESS environment variable
+    # - This avoids to start a new cluster at each script run
+    scheduler_address = dask.config.get("scheduler-address", None)
+    if scheduler_address is not None:
+        client = Client(scheduler_address)
+    else:
+        # Pre-import heavy modules in the forkserver process
+        # - Workers are forked from the forkserver and do not re-import them at every (re)start
+        # - get_mp_context() is called first, otherwise distributed overrides the preload list
+        mp_context = get_mp_context()
+        mp_context.set_forkserver_preload(["distributed", "numpy", "pandas", "pyarrow", "xarray", "satpy", "satbucket"])
+
+        # Create dask.distributed local cluster
+        # --> Use multiprocessing to avoid netCDF multithreading locks !
+        cluster = LocalCluster(
+            n_workers=num_workers,
+            threads_per_worker=1,  # important to set to 1 to avoid netcdf locking !
+            processes=True,
+            silence_logs=logging.WARN,
+        )
+
+        client = Client(cluster)
     # client.ncores()
     # client.nthreads()
 
@@ -55,6 +73,7 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
     # Define processing options
     parallel = True
     max_dask_total_tasks = 1000
+    batch_size = 8  # number of granules processed by each dask task
 
     ####----------------------------------------------------------------------.
     #### List all available files
@@ -113,6 +132,7 @@ if __name__ == "__main__":  #  https://github.com/dask/distributed/issues/2520
         parallel=True,
         max_concurrent_tasks=None,
         max_dask_total_tasks=max_dask_total_tasks,
+        batch_size=batch_size,
         # Writer kwargs
         **writer_kwargs,
     )
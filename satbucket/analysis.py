@@ -32,6 +32,7 @@ import numpy as np
 import pandas as pd
 import polars as pl
 import pyproj
+import xarray as xr
 from gpm.dataset.crs import set_dataset_crs
 from gpm.utils.xarray import xr_drop_constant_dimension, xr_first
 
@@ -182,6 +183,17 @@ def get_swath_indices(df, x_index, y_index):
     return (x_indices, x_values), (y_indices, y_values)
 
 
+def _get_missing_value(dtype):
+    """Return the dtype and the value used to fill missing footprints (as pandas reindex)."""
+    if np.issubdtype(dtype, np.floating):
+        return dtype, np.nan
+    if np.issubdtype(dtype, np.datetime64) or np.issubdtype(dtype, np.timedelta64):
+        return dtype, np.array("NaT", dtype=dtype)
+    if np.issubdtype(dtype, np.integer):
+        return np.dtype("float64"), np.nan
+    return np.dtype("O"), np.nan
+
+
 def overpass_to_dataset(df_overpass, x_dim, y_dim, x_index, y_index):
     """Reshape an overpass dataframe to a xarray.Dataset.
 
@@ -193,31 +205,38 @@ def overpass_to_dataset(df_overpass, x_dim, y_dim, x_index, y_index):
 
     # Retrieve dimension indices
     (x_indices, x_values), (y_indices, y_values) = get_swath_indices(df_overpass, x_index=x_index, y_index=y_index)
-    df_overpass["x_index"] = x_values
-    df_overpass["y_index"] = y_values
 
-    # Set index
-    df_overpass = df_overpass.set_index(["x_index", "y_index"])
+    # Retrieve the position of each footprint in the (x_index, y_index) grid
+    shape = (len(x_indices), len(y_indices))
+    x_pos = np.searchsorted(x_indices, np.asarray(x_values))
+    y_pos = np.searchsorted(y_indices, np.asarray(y_values))
+    flat_pos = np.ravel_multi_index((x_pos, y_pos), dims=shape)
 
-    # Remove duplicates
-    idx_duplicated = df_overpass.index.duplicated()
-    if idx_duplicated.any():
+    # Remove duplicates (keeping the first occurrence)
+    _, idx_unique = np.unique(flat_pos, return_index=True)
+    if len(idx_unique) < len(flat_pos):
         warnings.warn(
             "There are some duplicated index. This should not occur.",
             UserWarning,
             stacklevel=2,
         )
-    df_overpass = df_overpass[~idx_duplicated]
-
-    # Create MultiIndex with all possible combinations
-    full_index = pd.MultiIndex.from_product([x_indices, y_indices], names=["x_index", "y_index"])
-
-    # Reindex to include all interval combinations
-    # --> Add nan to rows with inexisitng index combo
-    df_swath = df_overpass.reindex(full_index)
+    flat_pos = flat_pos[idx_unique]
+    has_missing = len(flat_pos) < shape[0] * shape[1]
+
+    # Scatter the footprints values into the 2D (x_index, y_index) grid
+    # --> Add nan to inexisting footprints
+    dict_vars = {}
+    for column in df_overpass.columns:
+        values = df_overpass[column].to_numpy()[idx_unique]
+        dtype, fill_value = _get_missing_value(values.dtype) if has_missing else (values.dtype, None)
+        arr = np.empty(shape[0] * shape[1], dtype=dtype)
+        if has_missing:
+            arr[:] = fill_value
+        arr[flat_pos] = values
+        dict_vars[column] = (("x_index", "y_index"), arr.reshape(shape))
 
     # Convert to dataset
-    ds_swath = df_swath.to_xarray()
+    ds_swath = xr.Dataset(dict_vars, coords={"x_index": x_indices, "y_index": y_indices})
     # Case when dim name equal to index name
     if x_index == x_dim:
         ds_swath = ds_swath.drop_vars(x_dim)
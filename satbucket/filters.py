@@ -157,7 +157,7 @@ def _filter_filepath(filepath, filename_pattern, start_time=None, end_time=None)
 
     """
     try:
-        info_dict = get_info_from_filepath(filepath, filename_pattern)
+        info_dict = get_info_from_filepath(filepath, filename_pattern, time_only=True)
     except ValueError:
         return None
 
@@ -26,15 +26,45 @@
 # -----------------------------------------------------------------------------.
 """This module implements tools to extract information from file names."""
 import datetime
+import functools
 import os
+import re
 
 import numpy as np
 from trollsift import Parser
+from trollsift.parser import get_convert_dict, regex_format
 
 
-def parse_filename_pattern(filename, pattern):
-    p = Parser(pattern)
-    info_dict = p.parse(filename)
+@functools.lru_cache(maxsize=32)
+def _get_parser(pattern):
+    """Return the (cached) trollsift parser of a filename pattern."""
+    return Parser(pattern)
+
+
+@functools.lru_cache(maxsize=32)
+def compile_filename_pattern(pattern):
+    """Return the compiled regular expression and the time fields formats of a filename pattern.
+
+    The time fields are the fields with a ``strftime`` format specification (i.e. ``{start_time:%Y%m%d}``).
+    """
+    regex = re.compile("^" + regex_format(pattern) + "$")
+    time_formats = {key: fmt for key, fmt in get_convert_dict(pattern).items() if "%" in fmt}
+    return regex, time_formats
+
+
+def _parse_filename_times(filename, pattern):
+    """Parse only the time fields of a filename."""
+    regex, time_formats = compile_filename_pattern(pattern)
+    match = regex.match(filename)
+    if match is None:
+        raise ValueError("String does not match pattern.")
+    return {key: datetime.datetime.strptime(match.group(key), fmt) for key, fmt in time_formats.items()}
+
+
+def parse_filename_pattern(filename, pattern, time_only=False):
+    # Parse the filename
+    # - If time_only=True, the other fields are not converted
+    info_dict = _parse_filename_times(filename, pattern) if time_only else _get_parser(pattern).parse(filename)
 
     # Check start_time is available
     if "start_time" not in info_dict:
@@ -72,14 +102,14 @@ def parse_filename_pattern(filename, pattern):
     return info_dict
 
 
-def _get_info_from_filename(filename, filename_patterns):
+def _get_info_from_filename(filename, filename_patterns, time_only=False):
     """Retrieve file information dictionary from filename."""
     if isinstance(filename_patterns, str):
         filename_patterns = [filename_patterns]
     valid_pattern_found = False
     for pattern in filename_patterns:
         try:
-            info_dict = parse_filename_pattern(filename, pattern=pattern)
+            info_dict = parse_filename_pattern(filename, pattern=pattern, time_only=time_only)
             if "start_time" in info_dict and "end_time" in info_dict:
                 valid_pattern_found = True
         except Exception:
@@ -88,17 +118,20 @@ def _get_info_from_filename(filename, filename_patterns):
             break
 
     if not valid_pattern_found:
-        return ValueError("Invalid pattern specified.")
+        raise ValueError("Invalid pattern specified.")
     # Return info dictionary
     return info_dict
 
 
-def get_info_from_filepath(filepath, filename_pattern):
-    """Retrieve file information dictionary from filepath."""
+def get_info_from_filepath(filepath, filename_pattern, time_only=False):
+    """Retrieve file information dictionary from filepath.
+
+    If ``time_only=True``, only the time fields (i.e. ``start_time`` and ``end_time``) are returned.
+    """
     if not isinstance(filepath, str):
         raise TypeError("'filepath' must be a string.")
     filename = os.path.basename(filepath)
-    return _get_info_from_filename(filename, filename_patterns=filename_pattern)
+    return _get_info_from_filename(filename, filename_patterns=filename_pattern, time_only=time_only)
 
 
 def get_key_from_filepath(filepath, key, filename_pattern):
@@ -106,20 +139,44 @@ def get_key_from_filepath(filepath, key, filename_pattern):
     return get_info_from_filepath(filepath, filename_pattern=filename_pattern)[key]
 
 
-def get_key_from_filepaths(filepaths, key, filename_pattern):
-    """Extract specific key information from a list of filepaths."""
+def get_info_from_filepaths(filepaths, filename_pattern, time_only=False):
+    """Retrieve the file information dictionary of a list of filepaths.
+
+    If ``time_only=True``, only the time fields (i.e. ``start_time`` and ``end_time``) are returned.
+    """
     if isinstance(filepaths, str):
         filepaths = [filepaths]
-    return [get_key_from_filepath(filepath, key=key, filename_pattern=filename_pattern) for filepath in filepaths]
+    # Define the filename patterns once
+    # - The regular expression of each pattern is compiled only once
+    filename_patterns = [filename_pattern] if isinstance(filename_pattern, str) else list(filename_pattern)
+    # Parse the filenames in a single pass
+    filenames = [os.path.basename(filepath) for filepath in filepaths]
+    return [
+        _get_info_from_filename(filename, filename_patterns=filename_patterns, time_only=time_only)
+        for filename in filenames
+    ]
+
+
+def get_key_from_filepaths(filepaths, key, filename_pattern):
+    """Extract specific key information from a list of filepaths."""
+    list_info = get_info_from_filepaths(filepaths, filename_pattern=filename_pattern)
+    return [info_dict[key] for info_dict in list_info]
 
 
 def get_start_time_from_filepaths(filepaths, filename_pattern):
     """Infer granules ``start_time`` from file paths."""
-    return get_key_from_filepaths(filepaths, key="start_time", filename_pattern=filename_pattern)
+    list_info = get_info_from_filepaths(filepaths, filename_pattern=filename_pattern, time_only=True)
+    return [info_dict["start_time"] for info_dict in list_info]
 
 
 def get_start_end_time_from_filepaths(filepaths, filename_pattern):
     """Infer granules ``start_time`` and ``end_time`` from file paths."""
-    list_start_time = get_key_from_filepaths(filepaths, key="start_time", filename_pattern=filename_pattern)
-    list_end_time = get_key_from_filepaths(filepaths, key="end_time", filename_pattern=filename_pattern)
-    return np.array(list_start_time), np.array(list_end_time)
+    # Parse each filename only once
+    # - Only the time fields are converted
+    list_info = get_info_from_filepaths(filepaths, filename_pattern=filename_pattern, time_only=True)
+    list_start_time = [info_dict["start_time"] for info_dict in list_info]
+    list_end_time = [info_dict["end_time"] for info_dict in list_info]
+    # Return datetime64 arrays (instead of object arrays of datetime.datetime)
+    start_times = np.array(list_start_time, dtype="datetime64[ns]")
+    end_times = np.array(list_end_time, dtype="datetime64[ns]")
+    return start_times, end_times
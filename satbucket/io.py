@@ -27,6 +27,10 @@
 """This module provide utilities to search Satellite Geographic Buckets files."""
 import importlib
 import os
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from satbucket.utils.directories import get_filepaths_by_path, get_filepaths_within_paths
 from satbucket.utils.yaml import read_yaml, write_yaml
@@ -126,4 +130,43 @@ def get_filepaths_by_partition(bucket_dir, parallel=True, file_extension=None, g
     return dict_partition_files
 
 
+####---------------------------------------------------------------------------.
+#### Bucket manifest
+
+
+def get_bucket_manifest_filepath(bucket_dir):
+    """Return the filepath of the manifest listing the granules processed into the bucket."""
+    return os.path.join(bucket_dir, "_manifest.parquet")
+
+
+def read_bucket_manifest(bucket_dir):
+    """Return the filenames of the granules already processed into the bucket."""
+    manifest_filepath = get_bucket_manifest_filepath(bucket_dir)
+    if not os.path.exists(manifest_filepath):
+        return []
+    return pq.read_table(manifest_filepath, columns=["filename"])["filename"].to_pylist()
+
+
+def update_bucket_manifest(bucket_dir, filenames):
+    """Add the filenames of newly processed granules to the bucket manifest.
+
+    The manifest is rewritten at each update. It stores a single filename column
+    with one row per granule, and it is expected to remain small.
+    The new manifest is first written to a temporary file in the bucket directory
+    and then moved over the previous one, so that an interrupted update leaves the
+    previous manifest intact.
+    """
+    manifest_filepath = get_bucket_manifest_filepath(bucket_dir)
+    filenames = read_bucket_manifest(bucket_dir) + list(filenames)
+    table = pa.table({"filename": pa.array(filenames, type=pa.string())})
+    fd, tmp_filepath = tempfile.mkstemp(dir=bucket_dir, prefix="_manifest.", suffix=".tmp")
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_filepath)
+        os.replace(tmp_filepath, manifest_filepath)
+    except BaseException:
+        os.remove(tmp_filepath)
+        raise
+
+
 ####---------------------------------------------------------------------------.
@@ -31,6 +31,7 @@ from functools import reduce, wraps
 import numpy as np
 import pandas as pd
 import polars as pl
+import pyarrow as pa
 import pyproj.crs
 import xarray as xr
 from gpm.dataset.crs import set_dataset_crs
@@ -250,6 +251,50 @@ def query_indices(values, bounds):
     return pd.cut(values, bins=bounds, labels=False, include_lowest=True, right=True)
 
 
+def query_regular_indices(values, bounds, size):
+    """Return the index for the specified coordinates of regularly spaced bounds.
+
+    The bounds are expected to be spaced by ``size``, except maybe the last one.
+    The bin index is computed arithmetically and then corrected by comparison with the bounds,
+    so that the result is identical to ``query_indices`` without a binary search over the bounds.
+
+    It values is a polars.Series, returns a polars.Series !
+    Otherwise it returns a numpy.array.
+    Invalid values (NaN, None) or out of bounds values returns NaN (or null in polars).
+    """
+    if isinstance(values, pl.Series):
+        return pl_cut(values, bounds, include_lowest=True, right=True)
+    # Ensure 1d-dimensional array (convert scalars if specified)
+    values = np.atleast_1d(np.asanyarray(values))
+    # Convert to float if not yet the case
+    values = values.astype(float)
+    bounds = np.asanyarray(bounds)
+    # Compute the bin indices
+    # - NaN values are set to a dummy index
+    n_bins = len(bounds) - 1
+    indices = np.floor((values - bounds[0]) / size)
+    indices = np.fmin(np.fmax(indices, 0), n_bins - 1).astype(int)
+    # Correct floating point errors (and the possibly smaller last bin)
+    # - Bins are right-closed: (bounds[i], bounds[i+1]]
+    # - The lowest bound is included in the first bin
+    indices -= (values <= bounds[indices]) & (indices > 0)
+    indices += values > bounds[indices + 1]
+    # Set invalid values to NaN
+    is_invalid = ~((values >= bounds[0]) & (values <= bounds[-1]))
+    if np.any(is_invalid):
+        indices = indices.astype(float)
+        indices[is_invalid] = np.nan
+    return indices
+
+
+def get_centroids_labels(centroids, decimals):
+    """Return the string labels of the partitions centroids."""
+    labels_value = centroids.round(decimals)
+    if decimals == 0:
+        labels_value = labels_value.astype(int)
+    return labels_value.astype(str)
+
+
 def get_partition_dir_name(partition_name, partition_labels, flavor):
     """Return the directories name of a partition."""
     if flavor == "hive":
@@ -657,6 +702,8 @@ class Base2DPartitioning:
         """
         check_valid_dataframe(df)
         check_valid_x_y(df, x=x, y=y)
+        if isinstance(df, pa.Table):
+            return self._add_arrow_labels(table=df, x=x, y=y, remove_invalid_rows=remove_invalid_rows)
         x_arr = df_get_column(df, column=x)
         y_arr = df_get_column(df, column=y)
         # Retrieve labels
@@ -678,6 +725,38 @@ class Base2DPartitioning:
             df = df_select_valid_rows(df, valid_rows=~invalid_rows)
         return df
 
+    def _add_arrow_labels(self, table, x, y, remove_invalid_rows=True):
+        """Add partitions labels to a pyarrow.Table.
+
+        The labels are computed only once for each partition intersecting the table coordinates.
+        The labels columns are then created with an Arrow ``take`` kernel, without converting
+        the per-row labels of a numpy string array into Arrow.
+        """
+        x_indices, y_indices = self.query_indices(x=table[x].to_numpy(), y=table[y].to_numpy())
+        # Check if invalid coordinates
+        invalid_rows = np.isnan(x_indices) | np.isnan(y_indices)
+        invalid_rows_indices = np.where(invalid_rows)[0]
+        if invalid_rows_indices.size > 0:
+            if not remove_invalid_rows:
+                raise ValueError(f"Invalid labels at rows: {invalid_rows_indices.tolist()}")
+            # Remove invalid rows if remove_invalid_rows=True
+            table = table.filter(~invalid_rows)
+            x_indices = x_indices[~invalid_rows]
+            y_indices = y_indices[~invalid_rows]
+        # Retrieve the partitions intersecting the table
+        flat_indices = y_indices.astype(np.int64) * self.n_x + x_indices.astype(np.int64)
+        unique_flat_indices, rows_partition = np.unique(flat_indices, return_inverse=True)
+        # Retrieve labels of such partitions
+        # - If n_level = 1: array
+        # - If n_level = 2: tuple
+        labels = self.query_labels_by_indices(unique_flat_indices % self.n_x, unique_flat_indices // self.n_x)
+        if self.n_levels == 1:
+            labels = [labels]
+        # Add labels to the table
+        for partition, values in zip(self.levels, labels, strict=False):
+            table = table.append_column(partition, pa.array(values).take(rows_partition))
+        return table
+
     def add_centroids(self, df, x, y, x_coord=None, y_coord=None, remove_invalid_rows=True):
         """Add partitions centroids to the dataframe.
 
@@ -881,17 +960,25 @@ class XYPartitioning(Base2DPartitioning):
             order=order,
             flavor=flavor,
         )
+        # Precompute the labels of the partitions centroids
+        # - The labels of the points are then retrieved by indexing (instead of converting each value to string)
+        self._x_centroids_labels = get_centroids_labels(self.x_centroids, decimals=self._labels_decimals[0])
+        self._y_centroids_labels = get_centroids_labels(self.y_centroids, decimals=self._labels_decimals[1])
 
     # -----------------------------------------------------------------------------------.
+    @flatten_xy_arrays
+    def query_indices(self, x, y):
+        """Return the 2D partition indices for the specified x,y coordinates."""
+        x_indices = query_regular_indices(x, bounds=self.x_bounds, size=self.size[0])
+        y_indices = query_regular_indices(y, bounds=self.y_bounds, size=self.size[1])
+        return x_indices, y_indices
+
     def _custom_labels_function(self, x_indices, y_indices):
         """Return the partition labels as function of the specified 2D partitions indices."""
-        x_labels_value = self.x_centroids[x_indices].round(self._labels_decimals[0])
-        y_labels_value = self.y_centroids[y_indices].round(self._labels_decimals[1])
-
         # If input is polars series, return polars
         if isinstance(x_indices, pl.Series):
-            x_labels_value = pl.Series(x_labels_value)
-            y_labels_value = pl.Series(y_labels_value)
+            x_labels_value = pl.Series(self.x_centroids[x_indices].round(self._labels_decimals[0]))
+            y_labels_value = pl.Series(self.y_centroids[y_indices].round(self._labels_decimals[1]))
             if self._labels_decimals[0] == 0:
                 x_labels_value = x_labels_value.cast(int)
             if self._labels_decimals[1] == 0:
@@ -901,12 +988,8 @@ class XYPartitioning(Base2DPartitioning):
             return x_labels, y_labels
 
         # If numpy or pandas
-        if self._labels_decimals[0] == 0:
-            x_labels_value = x_labels_value.astype(int)
-        if self._labels_decimals[1] == 0:
-            y_labels_value = y_labels_value.astype(int)
-        x_labels = x_labels_value.astype(str)  # TODO: very slow for million points
-        y_labels = y_labels_value.astype(str)
+        x_labels = self._x_centroids_labels[x_indices]
+        y_labels = self._y_centroids_labels[y_indices]
         return x_labels, y_labels
 
     def to_dict(self):
@@ -1047,6 +1130,13 @@ class TilePartitioning(Base2DPartitioning):
         )
 
     # -----------------------------------------------------------------------------------.
+    @flatten_xy_arrays
+    def query_indices(self, x, y):
+        """Return the 2D partition indices for the specified x,y coordinates."""
+        x_indices = query_regular_indices(x, bounds=self.x_bounds, size=self.size[0])
+        y_indices = query_regular_indices(y, bounds=self.y_bounds, size=self.size[1])
+        return x_indices, y_indices
+
     def _custom_labels_function(self, x_indices, y_indices):
         """Return the partition labels for the specified x,y indices based on the direction, origin, and levels."""
         if self.n_levels == 2:
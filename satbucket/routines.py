@@ -25,29 +25,38 @@
 
 # -----------------------------------------------------------------------------.
 """This module provides the routines for the creation of Satellite Geographic Buckets."""
+import concurrent.futures
+import functools
+import itertools
+import math
 import os
+from collections import defaultdict
 
 import dask
 import numpy as np
 import pandas as pd
 import pyarrow as pa
 import pyarrow.dataset
+import pyarrow.fs
 import pyarrow.parquet as pq
 from tqdm import tqdm
 
 from satbucket.checks import check_start_end_time
-from satbucket.filters import filter_filepaths, is_within_time_period
+from satbucket.dataframe import df_is_column_in
+from satbucket.filters import filter_filepaths
 from satbucket.info import get_start_end_time_from_filepaths
 from satbucket.io import (
     get_bucket_spatial_partitioning,
     get_bucket_temporal_partitioning,
     get_exisiting_partitions_paths,
     get_filepaths_within_paths,
+    read_bucket_manifest,
+    update_bucket_manifest,
     write_bucket_info,
 )
 from satbucket.utils.dask import clean_memory, get_client
-from satbucket.utils.directories import get_first_file, list_and_filter_files
-from satbucket.utils.parallel import compute_list_delayed
+from satbucket.utils.directories import get_first_file_within_paths, list_and_filter_files
+from satbucket.utils.parallel import compute_as_completed
 from satbucket.utils.timing import print_task_elapsed_time
 from satbucket.writers import (
     preprocess_writer_kwargs,
@@ -59,8 +68,18 @@ from satbucket.writers import (
 #### Bucket Granules
 
 
-def split_list_in_blocks(values, block_size):
-    return [values[i : i + block_size] for i in range(0, len(values), block_size)]
+def iter_blocks(values, block_size):
+    """Yield successive blocks of ``block_size`` values."""
+    iterator = iter(values)
+    while block := list(itertools.islice(iterator, block_size)):
+        yield block
+
+
+def add_labels_if_missing(df, spatial_partitioning, x, y):
+    """Add the partitions labels columns to the dataframe if not already present."""
+    if all(df_is_column_in(df, column=level) for level in spatial_partitioning.levels):
+        return df
+    return spatial_partitioning.add_labels(df=df, x=x, y=y)
 
 
 def write_granule_bucket(
@@ -84,7 +103,9 @@ def write_granule_bucket(
     spatial_partitioning: satbucket.SpatialPartitioning
         A spatial partitioning class.
     granule_to_df_func : Callable
-        Function taking a granule filepath, opening it and returning a pandas or dask dataframe.
+        Function taking a granule filepath, opening it and returning a pandas, polars or dask dataframe
+        or a pyarrow.Table.
+        If the returned dataframe already contains the partitions labels columns, the labels are not recomputed.
     x: str
         The name of the x column. The default is "lon".
     y: str
@@ -111,8 +132,8 @@ def write_granule_bucket(
     if df is None:
         return
 
-    # Add partitioning columns
-    df = spatial_partitioning.add_labels(df=df, x=x, y=y)
+    # Add partitioning columns (if not already present)
+    df = add_labels_if_missing(df=df, spatial_partitioning=spatial_partitioning, x=x, y=y)
 
     # Write partitioned dataframe
     write_partitioned_dataset(
@@ -139,6 +160,11 @@ def _try_write_granule_bucket(**kwargs):
     return info
 
 
+def _try_write_granules_batch(src_filepaths, **kwargs):
+    """Write a batch of granules sequentially within a single task."""
+    return [_try_write_granule_bucket(src_filepath=src_filepath, **kwargs) for src_filepath in src_filepaths]
+
+
 @print_task_elapsed_time(prefix="Granules Bucketing Operation Terminated.")
 def write_granules_bucket(
     filepaths,
@@ -150,6 +176,8 @@ def write_granules_bucket(
     parallel=True,
     max_concurrent_tasks=None,
     max_dask_total_tasks=500,
+    batch_size=1,
+    skip_processed=False,
     # Writer kwargs
     use_threads=False,
     row_group_size="500MB",
@@ -172,17 +200,31 @@ def write_granules_bucket(
         - 10° degree corresponds to 648 directories (36*18)
         - 15° degree corresponds to 288 directories (24*12)
     granule_to_df_func : callable
-        Function taking a granule filepath, opening it and returning a pandas or dask dataframe.
+        Function taking a granule filepath, opening it and returning a pandas, polars or dask dataframe
+        or a pyarrow.Table.
     parallel : bool
         Whether to bucket several granules in parallel.
         The default is ``True``.
     max_concurrent_tasks : int
-        The maximum number of Dask tasks to be concurrently executed.
-        If ``None``, let the Dask Scheduler to choose.
+        The maximum number of Dask tasks submitted to the scheduler at the same time.
+        A new task is submitted as soon as a task completes.
+        If ``None``, it is set to ``max_dask_total_tasks``.
         The default is ``None``.
     max_dask_total_tasks : int
-        The maximum number of Dask tasks to be scheduled.
+        The number of completed Dask tasks after which the memory of the workers is released
+        (and the processed granules are recorded in the manifest if ``skip_processed=True``).
         The default is 500.
+    batch_size : int
+        The number of granules processed sequentially within each Dask task.
+        Increasing the batch size reduces the Dask scheduling overhead when
+        bucketing many small granules.
+        The default is 1.
+    skip_processed : bool
+        Whether to skip the granules already processed by previous calls.
+        If ``True``, the filenames of the successfully processed granules are recorded
+        in the ``_manifest.parquet`` file of the bucket directory and the granules
+        listed in the manifest are not processed again.
+        The default is ``False``.
     use_threads : bool
         Whether to write Parquet files with multiple threads.
         If bucketing granules in a multiprocessing environment, it's better to
@@ -207,47 +249,68 @@ def write_granules_bucket(
     # Write down the information of the bucket
     write_bucket_info(bucket_dir=bucket_dir, spatial_partitioning=spatial_partitioning)
 
-    # Split long list of files in blocks
-    list_blocks = split_list_in_blocks(filepaths, block_size=max_dask_total_tasks)
-
-    # Execute tasks by blocks to avoid dask overhead
-    n_blocks = len(list_blocks)
-
-    for i, block_filepaths in enumerate(list_blocks):
-        print(f"Executing tasks block {i+1}/{n_blocks}")
-
-        # Loop over granules
-        func = dask.delayed(_try_write_granule_bucket) if parallel else _try_write_granule_bucket
-
-        list_results = [
-            func(
-                src_filepath=src_filepath,
-                bucket_dir=bucket_dir,
-                spatial_partitioning=spatial_partitioning,
-                granule_to_df_func=granule_to_df_func,
-                # Writer kwargs
-                **writer_kwargs,
-            )
-            for src_filepath in block_filepaths
-        ]
+    # Discard granules already processed
+    if skip_processed:
+        processed_filenames = set(read_bucket_manifest(bucket_dir))
+        filepaths = [filepath for filepath in filepaths if os.path.basename(filepath) not in processed_filenames]
+        print(f"{len(processed_filenames)} granules already processed. {len(filepaths)} granules to process.")
+
+    # Split the list of files in batches
+    # - Each task processes a batch of batch_size granules
+    # - The batches are created only when the corresponding task is submitted
+    iter_batches = iter_blocks(filepaths, block_size=batch_size)
+    n_tasks = math.ceil(len(filepaths) / batch_size)
+    tasks_kwargs = {
+        "bucket_dir": bucket_dir,
+        "spatial_partitioning": spatial_partitioning,
+        "granule_to_df_func": granule_to_df_func,
+        # Writer kwargs
+        **writer_kwargs,
+    }
+
+    # Execute the tasks
+    # - If parallel=True, the tasks are streamed to the Dask workers with a bounded number of submitted tasks
+    # - Results are returned as soon as each task completes
+    if parallel:
+        if max_concurrent_tasks is None:
+            max_concurrent_tasks = max_dask_total_tasks
+        client = get_client()
+        iter_results = compute_as_completed(
+            _try_write_granules_batch,
+            list_kwargs=({"src_filepaths": batch_filepaths} for batch_filepaths in iter_batches),
+            max_concurrent_tasks=max_concurrent_tasks,
+            **tasks_kwargs,
+        )
+    else:
+        iter_results = (
+            (i, _try_write_granules_batch(src_filepaths=batch_filepaths, **tasks_kwargs))
+            for i, batch_filepaths in enumerate(iter_batches)
+        )
 
-        # If delayed, execute the tasks
-        if parallel:
-            list_results = compute_list_delayed(
-                list_results,
-                max_concurrent_tasks=max_concurrent_tasks,
-            )
+    processed_filenames = []
+    for n_completed, (i, batch_results) in enumerate(iter_results, start=1):
+        batch_filepaths = filepaths[i * batch_size : (i + 1) * batch_size]
 
         # Process results to detect errors
-        list_errors = [error_info for error_info in list_results if error_info is not None]
+        list_errors = [error_info for error_info in batch_results if error_info is not None]
         for src_filepath, error_str in list_errors:
             print(f"An error occurred while processing {src_filepath}: {error_str}")
 
-        # If parallel=True, retrieve client, clean the memory and restart
-        if parallel:
-            client = get_client()
-            clean_memory(client)
-            client.restart()
+        # Collect the granules processed without errors
+        if skip_processed:
+            error_filepaths = {src_filepath for src_filepath, _ in list_errors}
+            processed_filenames.extend(
+                [os.path.basename(filepath) for filepath in batch_filepaths if filepath not in error_filepaths],
+            )
+
+        # Periodically record the processed granules and release the memory of the workers
+        if n_completed % max_dask_total_tasks == 0 or n_completed == n_tasks:
+            print(f"{n_completed}/{n_tasks} tasks completed")
+            if skip_processed:
+                update_bucket_manifest(bucket_dir=bucket_dir, filenames=processed_filenames)
+                processed_filenames = []
+            if parallel:
+                clean_memory(client)
 
 
 ####--------------------------------------------------------------------------------------------------.
@@ -261,7 +324,7 @@ def write_bucket(
     y="lat",
     # Writer arguments
     filename_prefix="part",
-    row_group_size="500MB",
+    row_group_size="64MB",
     **writer_kwargs,
 ):
     """
@@ -271,6 +334,7 @@ def write_bucket(
     ----------
     df : pandas.DataFrame or dask.dataframe.DataFrame
         Pandas or Dask dataframe to be written into a geographic bucket.
+        If the dataframe already contains the partitions labels columns, the labels are not recomputed.
     bucket_dir: str
         Base directory of the geographic bucket archive.
     spatial_partitioning: satbucket.SpatialPartitioning
@@ -287,8 +351,10 @@ def write_bucket(
         The name of the y column. The default is "lat".
     row_group_size : int or str, optional
         Maximum number of rows in each written Parquet row group.
-        If specified as a string (i.e. "500 MB"), the equivalent row group size
-        number is estimated. The default is "500MB".
+        If specified as a string (i.e. "64 MB"), the equivalent row group size
+        number is estimated.
+        Smaller row groups allow readers to skip more data when querying a small area,
+        at the cost of larger file metadata. The default is "64MB".
     **writer_kwargs: dict
         Optional arguments to be passed to the pyarrow Dataset Writer.
         Common arguments are 'format' and 'use_threads'.
@@ -303,8 +369,8 @@ def write_bucket(
         spatial_partitioning=spatial_partitioning,
     )
 
-    # Add partitioning columns
-    df = spatial_partitioning.add_labels(df=df, x=x, y=y)
+    # Add partitioning columns (if not already present)
+    df = add_labels_if_missing(df=df, spatial_partitioning=spatial_partitioning, x=x, y=y)
 
     # Write bucket
     writer_kwargs["row_group_size"] = row_group_size
@@ -343,60 +409,61 @@ def define_dict_partitions(src_bucket_dir, src_spatial_partitioning, dst_spatial
     dir_trees = dst_spatial_partitioning.directories
     partitions_paths = get_exisiting_partitions_paths(src_bucket_dir, dir_trees)  # on 4096 directories ...
     # Define list of destination bucket partitions and source bucket directories
+    # - The partition label is given by the last n_levels directories of the path
+    # - rsplit stops splitting the path once the n_levels directories are found
     sep = os.path.sep
-    dict_partitions = {sep.join(path.strip(sep).split(sep)[-n_levels:]): [path] for path in partitions_paths}
+    dict_partitions = {sep.join(path.strip(sep).rsplit(sep, n_levels)[-n_levels:]): [path] for path in partitions_paths}
     return dict_partitions
 
 
 def get_template_table(dict_partitions):
     """Read and return a table template."""
     # Take the first file in the partitions
-    file_found = False
-    for list_src_dir in dict_partitions.values():
-        for path in list_src_dir:
-            filepath = get_first_file(path)
-            if filepath is not None:
-                file_found = True
-                break  # should break all loops
-        if file_found:
-            break
-
-    if not file_found:
+    # - The partitions directories are scanned concurrently
+    paths = [path for list_src_dir in dict_partitions.values() for path in list_src_dir]
+    filepath = get_first_file_within_paths(paths)
+    if filepath is None:
         raise ValueError("No file found in the source bucket archive.")
 
-    # Read the first parquet file found
-    template_table = pq.read_table(filepath)
+    # Read the first row group of the first parquet file found
+    # - The template table is used to define the schema and to estimate the memory size of each row
+    # - Reading a single row group avoids to load the entire file
+    with pq.ParquetFile(filepath) as parquet_file:
+        template_table = parquet_file.read_row_group(0)
     return template_table
 
 
+TIME_PREFIX_FUNCTIONS = {
+    "year": lambda timestep: f"{timestep.year}",  # e.g. "2021"
+    "month": lambda timestep: f"{timestep.year}_{timestep.month}",  # e.g. "2021_1"
+    # Q1: Jan-Mar, Q2: Apr-Jun, Q3: Jul-Sep, Q4: Oct-Dec
+    "quarter": lambda timestep: f"{timestep.year}_{(timestep.month - 1) // 3 + 1}",  # e.g. "2021_1" for Q1 2021
+    "day": lambda timestep: f"{timestep.year}_{timestep.month}_{timestep.day}",  # e.g. "2021_1_15"
+}
+
+
 def get_time_prefix(timestep, temporal_partitioning):
     """Define a time prefix string from a datetime object."""
-    if temporal_partitioning == "year":
-        return f"{timestep.year}"  # e.g. "2021"
-    if temporal_partitioning == "month":
-        return f"{timestep.year}_{timestep.month}"  # e.g. "2021_1"
-    if temporal_partitioning == "quarter":
-        # Q1: Jan-Mar, Q2: Apr-Jun, Q3: Jul-Sep, Q4: Oct-Dec
-        quarter = (timestep.month - 1) // 3 + 1
-        return f"{timestep.year}_{quarter}"  # e.g. "2021_1" for Q1 2021
-    if temporal_partitioning == "day":
-        return f"{timestep.year}_{timestep.month}_{timestep.day}"
-    raise NotImplementedError(f"Invalid '{temporal_partitioning}' temporal_partitioning")
+    try:
+        return TIME_PREFIX_FUNCTIONS[temporal_partitioning](timestep)
+    except KeyError:
+        raise NotImplementedError(f"Invalid '{temporal_partitioning}' temporal_partitioning") from None
 
 
+@functools.lru_cache(maxsize=32)
 def get_partitioning_boundaries(start_time, end_time, temporal_partitioning):
-    """Define a time prefix string from a datetime object."""
+    """Define the time boundaries of the temporal partitions.
+
+    The boundaries are cached, as they are requested for each spatial partition
+    with the same time period during the merging of the granule buckets.
+    """
     # --------
     # YEAR
     if temporal_partitioning == "year":
         if end_time != pd.Timestamp(f"{end_time.year}-01-01 00:00:00"):
             end_time = end_time + pd.DateOffset(years=1)
-        boundaries = pd.date_range(
-            start=pd.Timestamp(f"{start_time.year}-01-01"),
-            end=pd.Timestamp(f"{end_time.year}-01-01"),
-            freq="YS",
-        )
-        return boundaries
+        boundaries = np.arange(f"{start_time.year}", f"{end_time.year + 1}", dtype="datetime64[Y]")
+        return pd.DatetimeIndex(boundaries.astype("datetime64[ns]"))
 
     # --------
     # MONTH
@@ -437,43 +504,46 @@ def get_partitioning_boundaries(start_time, end_time, temporal_partitioning):
     if temporal_partitioning == "day":
         if end_time != end_time.normalize():
             end_time = end_time.normalize() + pd.DateOffset(days=1)
-        boundaries = pd.date_range(
-            start=pd.Timestamp(f"{start_time.year}-{start_time.month}-{start_time.day} 00:00:00"),
-            end=end_time,
-            freq="D",
+        boundaries = np.arange(
+            np.datetime64(pd.Timestamp(start_time), "D"),
+            np.datetime64(end_time, "D") + 1,
+            dtype="datetime64[D]",
         )
-        return boundaries
+        return pd.DatetimeIndex(boundaries.astype("datetime64[ns]"))
     raise NotImplementedError(f"Invalid '{temporal_partitioning}' temporal_partitioning")
 
 
 def get_list_group_periods(start_time, end_time, temporal_partitioning):
-    """List group time periods."""
-    # Retrieve group time boundaries
-    boundaries = get_partitioning_boundaries(start_time, end_time, temporal_partitioning)
+    """List group time periods.
 
-    # Define list with group time information
-    intervals = []
-    for i, group_start in enumerate(boundaries):
-        # Retrieve group end time
-        group_end = boundaries[i + 1] if i < len(boundaries) - 1 else end_time
-
-        # Clamp the boundaries to the overall [start_time, end_time)
-        group_start = max(group_start, start_time)
-        group_end = min(group_end, end_time)
+    Returns a dictionary with the ``prefix``, ``start`` and ``end`` of the groups time periods.
+    The ``start`` and ``end`` time periods are ``datetime64[ns]`` arrays.
+    """
+    # Retrieve group time boundaries
+    boundaries = get_partitioning_boundaries(start_time, end_time, temporal_partitioning).to_numpy()
+    start_time = pd.Timestamp(start_time).to_datetime64()
+    end_time = pd.Timestamp(end_time).to_datetime64()
 
-        # Build time prefix (e.g., "2021", "2021_1", "2021_1_15", etc.)
-        time_prefix = get_time_prefix(group_start, temporal_partitioning)
+    # Retrieve group start and end times
+    # - The last group ends at end_time
+    # - The boundaries are clamped to the overall [start_time, end_time)
+    group_starts = np.maximum(boundaries, start_time)
+    group_ends = np.minimum(np.append(boundaries, end_time)[1:], end_time)
 
-        # Avoid zero-length intervals
-        if group_start < group_end:
-            intervals.append((time_prefix, group_start, group_end))
+    # Avoid zero-length intervals
+    is_valid = group_starts < group_ends
+    group_starts = group_starts[is_valid]
+    group_ends = group_ends[is_valid]
 
-    return intervals
+    # Build time prefix (e.g., "2021", "2021_1", "2021_1_15", etc.)
+    time_prefixes = [get_time_prefix(pd.Timestamp(group_start), temporal_partitioning) for group_start in group_starts]
+    return {"prefix": time_prefixes, "start": group_starts, "end": group_ends}
 
 
 def group_files_by_time(filepaths, start_time, end_time, temporal_partitioning, filename_pattern):
     # Convert to numpy array
-    filepaths = np.array(filepaths)
+    # - An object array avoids to copy the strings into a fixed-width unicode array
+    filepaths = np.asarray(filepaths, dtype=object)
 
     # Retrieve start time and end_time of each file
     l_start_time, l_end_time = get_start_end_time_from_filepaths(filepaths, filename_pattern=filename_pattern)
@@ -485,31 +555,62 @@ def group_files_by_time(filepaths, start_time, end_time, temporal_partitioning,
         end_time = pd.Timestamp(l_end_time.max())
 
     # Define possible group_start_time and group_end_time
-    list_group_periods = get_list_group_periods(start_time, end_time, temporal_partitioning)
+    group_periods = get_list_group_periods(start_time, end_time, temporal_partitioning)
+    group_starts = group_periods["start"]
+    group_ends = group_periods["end"]
+
+    # Retrieve the range of groups overlapping each file
+    # - The groups are sorted and contiguous, so a single searchsorted pass is required
+    # - Files with zero duration are assigned to the groups including their timestep (bounds included)
+    is_instantaneous = l_start_time == l_end_time
+    idx_first = np.where(
+        is_instantaneous,
+        np.searchsorted(group_ends, l_start_time, side="left"),
+        np.searchsorted(group_ends, l_start_time, side="right"),
+    )
+    idx_last = (
+        np.where(
+            is_instantaneous,
+            np.searchsorted(group_starts, l_end_time, side="right"),
+            np.searchsorted(group_starts, l_end_time, side="left"),
+        )
+        - 1
+    )
+
+    # Expand to (file, group) pairs
+    n_groups = np.clip(idx_last - idx_first + 1, a_min=0, a_max=None)
+    files_indices = np.repeat(np.arange(len(filepaths)), n_groups)
+    offsets = np.arange(n_groups.sum()) - np.repeat(np.cumsum(n_groups) - n_groups, n_groups)
+    groups_indices = np.repeat(idx_first, n_groups) + offsets
 
     # List all filepaths for each time group
+    # - A stable sort preserves the order of the filepaths within each group
+    sort_indices = np.argsort(groups_indices, kind="stable")
+    files_indices = files_indices[sort_indices]
+    groups_indices = groups_indices[sort_indices]
+    unique_groups, split_indices = np.unique(groups_indices, return_index=True)
+    split_indices = np.append(split_indices, len(files_indices))
+
     groups_dict = {}
-    # group_key, group_start_time, group_end_time = list_group_periods[2]
-    for group_key, group_start_time, group_end_time in list_group_periods:
-        is_within_group = is_within_time_period(
-            l_start_time=l_start_time,
-            l_end_time=l_end_time,
-            start_time=group_start_time,
-            end_time=group_end_time,
-        )
-        list_group_filepaths = filepaths[is_within_group]
-        if len(list_group_filepaths) > 0:
-            groups_dict[group_key] = (group_start_time, group_end_time, list_group_filepaths)
+    for group_idx, start, stop in zip(unique_groups, split_indices[:-1], split_indices[1:], strict=True):
+        group_key = group_periods["prefix"][group_idx]
+        group_start_time = pd.Timestamp(group_starts[group_idx])
+        group_end_time = pd.Timestamp(group_ends[group_idx])
+        groups_dict[group_key] = (group_start_time, group_end_time, filepaths[files_indices[start:stop]])
 
     return groups_dict
 
 
+@functools.lru_cache(maxsize=4096)
 def define_dataset_filter(
     start_time,
     end_time,
     # dst_spatial_partitioning, partition_label or extent
 ):
+    """Define the (cached) pyarrow.Expression filtering the rows within a time period.
 
+    The same time groups are merged in every partition, so the expressions are shared across partitions.
+    """
     time_filter = (pyarrow.dataset.field("time") >= start_time) & (pyarrow.dataset.field("time") < end_time)
 
     # Create the spatial filter for longitude and latitude
@@ -526,6 +627,146 @@ def define_dataset_filter(
     return dataset_filter
 
 
+def _merge_partition(
+    partition_label,
+    list_src_partition_dir,
+    *,
+    dst_bucket_dir,
+    filename_pattern,
+    temporal_partitioning,
+    start_time,
+    end_time,
+    update,
+    schema,
+    file_format,
+    filesystem,
+    scanner_kwargs,
+    writer_kwargs,
+    write_metadata,
+):
+    """Merge the source partitions directories files into a destination bucket partition.
+
+    If ``write_metadata=True``, return the list of the parquet metadata of the written files,
+    with the file paths relative to the destination bucket directory.
+    """
+    # Retrieve all available filepaths (sorted)
+    # - The source directories are listed concurrently if more than one
+    filepaths = get_filepaths_within_paths(
+        paths=list_src_partition_dir,
+        parallel=len(list_src_partition_dir) > 1,
+        file_extension=".parquet",
+        glob_pattern=None,
+        regex_pattern=None,
+    )
+    # Filter by time window
+    if start_time is not None and end_time is not None:
+        filepaths = filter_filepaths(
+            filepaths,
+            start_time=start_time,
+            end_time=end_time,
+            filename_pattern=filename_pattern,
+        )
+
+    # Check file left
+    if len(filepaths) == 0:
+        print(f"No data to consolidate for partition {partition_label}.")
+        return []
+
+    # Define destination partition directory
+    dst_partition_dir = os.path.join(dst_bucket_dir, partition_label)
+
+    # If the directory already exists and update=False, raise an error !
+    if not update and os.path.exists(dst_partition_dir):
+        raise ValueError(f"The partition {partition_label} already exists. Use 'update=True' to update an archive.")
+
+    # Define groups to create
+    groups_dict = group_files_by_time(
+        filepaths=filepaths,
+        start_time=start_time,
+        end_time=end_time,
+        filename_pattern=filename_pattern,
+        temporal_partitioning=temporal_partitioning,
+    )
+
+    # If update=True, remove archived destination files of groups to be updated
+    if update:
+        # Ensure partition directory exists
+        os.makedirs(dst_partition_dir, exist_ok=True)
+
+        # Retrieve path of existing files in the destination archive
+        existing_filepaths = list_and_filter_files(
+            path=dst_partition_dir,
+            file_extension=".parquet",
+            glob_pattern=None,
+            regex_pattern=None,
+            sort=False,  # small speed up
+        )
+
+        # Remove files with the same time_prefix (old file)
+        # - Examples of groups_dict keys: 2021_1 when groups=["year", "month"]
+        # - Example of filename: 2021_1_{i}.parquet where {i} is an id given by pyarrow parquet
+        # - The existing files are first grouped by time_prefix, so to not compare each file with each group
+        dict_existing_filepaths = defaultdict(list)
+        for filepath in existing_filepaths:
+            time_prefix = os.path.basename(filepath).rsplit("_", 1)[0]
+            dict_existing_filepaths[time_prefix].append(filepath)
+        for time_prefix in groups_dict:
+            for filepath in dict_existing_filepaths.get(time_prefix, []):
+                os.remove(filepath)
+
+    # Define file visitor for metadata collection
+    # - The metadata are collected per partition, so that partitions can be merged concurrently
+    partition_metadata = []
+    if write_metadata:
+
+        def file_visitor(written_file):
+            metadata = written_file.metadata
+            metadata.set_file_path(os.path.relpath(written_file.path, dst_bucket_dir))
+            partition_metadata.append(metadata)
+
+        writer_kwargs = {**writer_kwargs, "file_visitor": file_visitor}
+
+    # Save a consolidated parquet by the specified time group
+    for time_prefix, (group_start_time, group_end_time, src_filepaths) in groups_dict.items():
+
+        # Define filename pattern
+        basename_template = f"{time_prefix}_" + "{i}.parquet"
+
+        # Define pyarrow.Expression to filter rows based on time and geolocation/geometry
+        # - TODO: geolocation filter when repartitioning
+        dataset_filter = define_dataset_filter(
+            start_time=group_start_time,
+            end_time=group_end_time,
+            # dst_spatial_partitioning, partition_label or extent
+        )
+
+        # Read Dataset
+        # - Provide the template schema to avoid inspecting the files of each group
+        # - The filepaths have just been listed, so they are not checked again to exist
+        dataset = pyarrow.dataset.FileSystemDataset.from_paths(
+            list(src_filepaths),
+            schema=schema,
+            format=file_format,
+            filesystem=filesystem,
+        )
+
+        # Define scanner
+        scanner = dataset.scanner(filter=dataset_filter, **scanner_kwargs)
+
+        # Rewrite dataset
+        pa.dataset.write_dataset(
+            scanner,
+            base_dir=dst_partition_dir,
+            basename_template=basename_template,
+            # Directory options
+            create_dir=True,
+            existing_data_behavior="overwrite_or_ignore",
+            # Options
+            **writer_kwargs,
+        )
+    return partition_metadata
+
+
 @print_task_elapsed_time(prefix="Bucket Merging Terminated.")
 def merge_granule_buckets(
     src_bucket_dir,
@@ -539,19 +780,24 @@ def merge_granule_buckets(
     end_time=None,
     update=False,
     # Parquet options
-    row_group_size="200MB",
+    row_group_size="64MB",
     max_file_size="2GB",
     compression="snappy",
     compression_level=None,
+    use_byte_stream_split=False,
     write_metadata=False,
     write_statistics=False,
+    write_page_index=False,
     # Computing options
     max_open_files=0,
     use_threads=True,
+    max_concurrent_partitions=1,
     # Scanner options
     batch_size=131_072,
     batch_readahead=10,
     fragment_readahead=20,
+    pre_buffer=True,
+    cache_options=None,
 ):
     """Merge the per-granule bucket archive in a single optimized archive.
 
@@ -597,10 +843,18 @@ def merge_granule_buckets(
         allow skipping irrelevant row groups or reading of entire files.
         If ``True`` (or some columns are specified), the routine can take much longer to execute !
         The default is ``False``
+    write_page_index: bool
+        Whether to write the Parquet page index (offset and column index) of each column chunk.
+        With ``write_statistics=True``, the page index allows readers to skip the data pages
+        not matching a filter within a row group. Only the offset index is written otherwise.
+        The default is ``False``.
     row_group_size : int or str, optional
         Maximum number of rows to be written in each Parquet row group.
-        If specified as a string (i.e. ``"200 MB"``), the equivalent number of rows is estimated.
-        The default is ``"200MB"``.
+        If specified as a string (i.e. ``"64 MB"``), the equivalent number of rows is estimated.
+        Smaller row groups allow readers to skip more data when querying a small area
+        (if ``write_statistics=True``), while larger row groups reduce the file metadata size
+        and the per row group overhead when scanning the whole archive.
+        The default is ``"64MB"``.
     max_file_size: str, optional
         Maximum number of rows to be written in a Parquet file.
         If specified as a string, the equivalent number of rows is estimated.
@@ -617,6 +871,13 @@ def merge_granule_buckets(
         to read the pyArrow documentation of the codec you are using at
         https://arrow.apache.org/docs/python/generated/pyarrow.Codec.html
         The default is ``None``.
+    use_byte_stream_split : bool or list, optional
+        Whether to use the BYTE_STREAM_SPLIT encoding for all floating point columns or some specific columns.
+        The encoding splits the bytes of fixed-width values (i.e. floats) into separate streams,
+        which often improves the compression ratio of floating point columns (especially with ``"zstd"``).
+        The dictionary encoding takes precedence over the BYTE_STREAM_SPLIT encoding,
+        so the specified columns are not dictionary-encoded.
+        The default is ``False``.
     max_open_files, int, optional
         If greater than 0 then this will limit the maximum number of files that can be left open.
         If an attempt is made to open too many files then the least recently used file will be closed.
@@ -624,10 +885,18 @@ def merge_granule_buckets(
         The default is ``0``.
         Note that Linux has a default limit of ``1024``. Before starting the python session,
         increase it with ``ulimit -n <new_much_higher_limit>``.
+        The limit applies to each partition being merged concurrently.
     use_threads: bool, optional
         If enabled, then maximum parallelism will be used to read and write files (in multithreading).
         The number of threads is determined by the number of available CPU cores.
         The default is ``True``.
+    max_concurrent_partitions : int, optional
+        Maximum number of partitions to merge concurrently (in multithreading).
+        Merging multiple partitions concurrently helps to keep the CPU busy when the archive
+        is composed of many small partitions, for which the reading and writing of a single
+        partition can not saturate the available cores.
+        The memory usage increases proportionally to the number of concurrent partitions.
+        The default is ``1``.
     batch_size : int
         Maximum number of rows per record batch produced by the dataset scanner.
         For concatenating small files (each typically a single fragment with one row group),
@@ -646,6 +915,17 @@ def merge_granule_buckets(
         Increasing this number will increase RAM usage but could also improve IO utilization.
         Prefetching multiple fragments concurrently helps hide the latency of opening and reading each file.
         The default is ``20``.
+    pre_buffer : bool
+        Whether to pre-buffer the raw Parquet data of each row group instead of issuing one read per column chunk.
+        The reads of adjacent column chunks are coalesced and issued in parallel,
+        which improves the performance on high-latency file systems (i.e. network file systems).
+        Set it to ``False`` to prioritize a minimal memory usage.
+        The default is ``True``.
+    cache_options : pyarrow.CacheOptions, optional
+        Options to coalesce the reads when ``pre_buffer=True``.
+        The ``hole_size_limit`` and ``range_size_limit`` options can be increased
+        for file systems with a very high latency.
+        The default, ``None``, uses the pyarrow defaults.
 
     Recommendations
     ---------------
@@ -655,6 +935,10 @@ def merge_granule_buckets(
       greater performance benefits than batch_readahead in this context.
     - Adjust these parameters based on system memory and available threads; while they operate
       asynchronously, excessively high values may oversubscribe system resources without further gains.
+    - The memory buffered by the scanner is roughly bounded by
+      ``fragment_readahead * batch_readahead * batch_size * row_bytes``, where ``row_bytes``
+      is the in-memory size of a row. For source files with large row groups, reduce
+      ``fragment_readahead`` first, as each prefetched file buffers at least one full row group.
 
     Returns
     -------
@@ -717,7 +1001,6 @@ def merge_granule_buckets(
 
     # -----------------------------------------------------------------------------------------------.
     # Retrieve table schema
-    # - spatial_partitioning.levels are read by pq.read_table as dictionaries (depending on pyarrow version)
     # - spatial_partitioning.levels columns must be dropped by the table if present
     template_table = get_template_table(dict_partitions)
     if np.all(np.isin(dst_spatial_partitioning.levels, template_table.column_names)):
@@ -730,15 +1013,27 @@ def merge_granule_buckets(
     writer_kwargs["max_file_size"] = max_file_size
     writer_kwargs["compression"] = compression
     writer_kwargs["compression_level"] = compression_level
+    writer_kwargs["use_byte_stream_split"] = use_byte_stream_split
     writer_kwargs["max_open_files"] = max_open_files
     writer_kwargs["use_threads"] = use_threads
-    writer_kwargs["write_metadata"] = write_metadata
     writer_kwargs["write_statistics"] = write_statistics
-    writer_kwargs, metadata_collector = preprocess_writer_kwargs(
+    writer_kwargs["write_page_index"] = write_page_index
+    writer_kwargs, _ = preprocess_writer_kwargs(
         writer_kwargs=writer_kwargs,
         df=template_table,
     )
 
+    # Define Parquet fragments scan options
+    fragment_scan_options = pyarrow.dataset.ParquetFragmentScanOptions(
+        pre_buffer=pre_buffer,
+        cache_options=cache_options,
+    )
+
+    # Define the source files format and file system
+    # - The same objects are shared by the datasets of all time groups and partitions
+    file_format = pyarrow.dataset.ParquetFileFormat()
+    filesystem = pyarrow.fs.LocalFileSystem()
+
     # -----------------------------------------------------------------------------------------------.
     # Concatenate data within bins
     # - Cannot rewrite directly the full pyarrow.dataset because there is no way to specify when
@@ -746,106 +1041,63 @@ def merge_granule_buckets(
     print("Start concatenating the granules bucket archive")
 
     n_partitions = len(dict_partitions)
-    # partition_label = list(dict_partitions)[0]
-    # list_src_partition_dir = dict_partitions[partition_label]
-    for partition_label, list_src_partition_dir in tqdm(dict_partitions.items(), total=n_partitions):
-        # Retrieve all available filepaths (sorted)
-        filepaths = get_filepaths_within_paths(
-            paths=list_src_partition_dir,
-            parallel=False,
-            file_extension=".parquet",
-            glob_pattern=None,
-            regex_pattern=None,
-        )
-        # Filter by time window
-        if start_time is not None and end_time is not None:
-            filepaths = filter_filepaths(
-                filepaths,
-                start_time=start_time,
-                end_time=end_time,
-                filename_pattern=filename_pattern,
-            )
-
-        # Check file left
-        if len(filepaths) == 0:
-            print(f"No data to consolidate for partition {partition_label}.")
-            continue
-
-        # Define destination partition directory
-        dst_partition_dir = os.path.join(dst_bucket_dir, partition_label)
-
-        # If the directory already exists and update=False, raise an error !
-        if not update and os.path.exists(dst_partition_dir):
-            raise ValueError(f"The partition {partition_label} already exists. Use 'update=True' to update an archive.")
-
-        # Define groups to create
-        groups_dict = group_files_by_time(
-            filepaths=filepaths,
-            start_time=start_time,
-            end_time=end_time,
-            filename_pattern=filename_pattern,
-            temporal_partitioning=temporal_partitioning,
-        )
-
-        # If update=True, remove archived destination files of groups to be updated
-        if update:
-            # Ensure partition directory exists
-            os.makedirs(dst_partition_dir, exist_ok=True)
-
-            # Retrieve path of existing files in the destination archive
-            existing_filepaths = list_and_filter_files(
-                path=dst_partition_dir,
-                file_extension=".parquet",
-                glob_pattern=None,
-                regex_pattern=None,
-                sort=False,  # small speed up
-            )
-
-            # Remove files that starts with the same time_prefix (old file)
-            # - Examples of groups_dict keys: 2021_1 when groups=["year", "month"]
-            # - Example of filename: 2021_1_{i}.parquet where {i} is an id given by pyarrow parquet
-            for time_prefix in list(groups_dict):
-                for filepath in existing_filepaths:
-                    if os.path.basename(filepath).startswith(time_prefix):
-                        os.remove(filepath)
-
-        # Save a consolidated parquet by the specified time group
-        for time_prefix, (group_start_time, group_end_time, src_filepaths) in groups_dict.items():
-
-            # Define filename pattern
-            basename_template = f"{time_prefix}_" + "{i}.parquet"
-
-            # Define pyarrow.Expression to filter rows based on time and geolocation/geometry
-            # - TODO: geolocation filter when repartitioning
-            dataset_filter = define_dataset_filter(
-                start_time=group_start_time,
-                end_time=group_end_time,
-                # dst_spatial_partitioning, partition_label or extent
-            )
-
-            # Read Dataset
-            dataset = pyarrow.dataset.dataset(list(src_filepaths), format="parquet")
-
-            # Define scanner
-            scanner = dataset.scanner(
-                batch_size=batch_size,
-                batch_readahead=batch_readahead,
-                fragment_readahead=fragment_readahead,
-                use_threads=use_threads,
-                filter=dataset_filter,
-            )
-
-            # Rewrite dataset
-            pa.dataset.write_dataset(
-                scanner,
-                base_dir=dst_partition_dir,
-                basename_template=basename_template,
-                # Directory options
-                create_dir=True,
-                existing_data_behavior="overwrite_or_ignore",
-                # Options
-                **writer_kwargs,
+    scanner_kwargs = {
+        "batch_size": batch_size,
+        "batch_readahead": batch_readahead,
+        "fragment_readahead": fragment_readahead,
+        "fragment_scan_options": fragment_scan_options,
+        "use_threads": use_threads,
+    }
+    merge_kwargs = {
+        "dst_bucket_dir": dst_bucket_dir,
+        "filename_pattern": filename_pattern,
+        "temporal_partitioning": temporal_partitioning,
+        "start_time": start_time,
+        "end_time": end_time,
+        "update": update,
+        "schema": schema,
+        "file_format": file_format,
+        "filesystem": filesystem,
+        "scanner_kwargs": scanner_kwargs,
+        "writer_kwargs": writer_kwargs,
+        "write_metadata": write_metadata,
+    }
+    # - The progress bar is refreshed at most every 2 seconds
+    # - A lower smoothing gives a more stable estimate of the remaining time with partitions of uneven size
+    if max_concurrent_partitions == 1:
+        list_partition_metadata = [
+            _merge_partition(partition_label, list_src_partition_dir, **merge_kwargs)
+            for partition_label, list_src_partition_dir in tqdm(
+                dict_partitions.items(),
+                total=n_partitions,
+                mininterval=2.0,
+                smoothing=0.1,
             )
+        ]
+    else:
+        # Merge multiple partitions concurrently
+        # - Arrow releases the GIL while reading, encoding and writing the data
+        # - The pending partitions are cancelled as soon as the merging of a partition fails
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrent_partitions) as executor:
+            futures = [
+                executor.submit(_merge_partition, partition_label, list_src_partition_dir, **merge_kwargs)
+                for partition_label, list_src_partition_dir in dict_partitions.items()
+            ]
+            for future in tqdm(
+                concurrent.futures.as_completed(futures),
+                total=n_partitions,
+                mininterval=2.0,
+                smoothing=0.1,
+            ):
+                try:
+                    future.result()
+                except Exception:
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise
+        list_partition_metadata = [future.result() for future in futures]
+
+    # Combine the metadata of all partitions (in partition order)
+    metadata_collector = list(itertools.chain.from_iterable(list_partition_metadata))
 
     # Write metadata if asked
     if write_metadata and metadata_collector:
@@ -0,0 +1,91 @@
+# -----------------------------------------------------------------------------.
+# MIT License
+
+# Copyright (c) 2024 GPM-API developers
+#
+# This file is part of GPM-API.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# -----------------------------------------------------------------------------.
+"""This module tests the bucket analysis utilities."""
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+
+from satbucket.analysis import overpass_to_dataset
+
+
+def create_overpass_dataframe(n_along_track=4, n_cross_track=3):
+    """Create a dataframe with the footprints of a satellite overpass spanning two granules."""
+    along_track_ids = np.arange(n_along_track)
+    granule_ids = np.where(along_track_ids < n_along_track // 2, 1, 2)
+    df = pd.DataFrame(
+        {
+            "gpm_id": np.repeat([f"{g}-{a}" for g, a in zip(granule_ids, along_track_ids, strict=True)], n_cross_track),
+            "gpm_cross_track_id": np.tile(np.arange(n_cross_track), n_along_track),
+            "lon": np.linspace(0, 1, n_along_track * n_cross_track),
+            "lat": np.linspace(2, 3, n_along_track * n_cross_track),
+            "time": np.repeat(np.datetime64("2020-01-01T00:00:00", "ns") + np.arange(n_along_track), n_cross_track),
+            "flag": np.arange(n_along_track * n_cross_track, dtype="int16"),
+        },
+    )
+    return df
+
+
+@pytest.mark.parametrize("backend", ["pandas", "polars"])
+def test_overpass_to_dataset(backend):
+    """Test reshaping an overpass dataframe with missing footprints to a xarray.Dataset."""
+    df = create_overpass_dataframe(n_along_track=4, n_cross_track=3)
+    # Remove a footprint
+    df = df.drop(index=4).reset_index(drop=True)
+    if backend == "polars":
+        df = pl.from_pandas(df)
+
+    ds = overpass_to_dataset(
+        df,
+        x_dim="along_track",
+        y_dim="cross_track",
+        x_index="gpm_id",
+        y_index="gpm_cross_track_id",
+    )
+
+    assert dict(ds.sizes) == {"cross_track": 3, "along_track": 4}
+    assert ds["time"].dims == ("along_track",)
+    assert ds["lon"].dims == ("cross_track", "along_track")
+    # Check missing footprint is filled with NaN
+    assert np.isnan(ds["flag"].isel(along_track=1, cross_track=1).item())
+    np.testing.assert_allclose(ds["flag"].isel(along_track=0).to_numpy(), [0, 1, 2])
+    np.testing.assert_allclose(ds["flag"].isel(along_track=3).to_numpy(), [9, 10, 11])
+
+
+def test_overpass_to_dataset_duplicated_footprints():
+    """Test that duplicated footprints raise a warning and the first occurrence is kept."""
+    df = create_overpass_dataframe(n_along_track=2, n_cross_track=2)
+    df = pd.concat([df, df.iloc[[0]].assign(flag=99)], ignore_index=True)
+    with pytest.warns(UserWarning, match="duplicated index"):
+        ds = overpass_to_dataset(
+            df,
+            x_dim="along_track",
+            y_dim="cross_track",
+            x_index="gpm_id",
+            y_index="gpm_cross_track_id",
+        )
+    assert ds["flag"].isel(along_track=0, cross_track=0).item() == 0
@@ -1,8 +1,9 @@
 import datetime
 
+import numpy as np
 import pytest
 
-from satbucket.info import parse_filename_pattern
+from satbucket.info import get_key_from_filepaths, get_start_end_time_from_filepaths, parse_filename_pattern
 
 
 class TestParseFilenamePattern:
@@ -65,6 +66,22 @@ class TestParseFilenamePattern:
         assert result["start_time"] == datetime.datetime(2024, 5, 1, 23, 0, 0)
         assert result["end_time"] == datetime.datetime(2024, 5, 2, 0, 30, 0)
 
+    def test_time_only(self):
+        """Test parsing only the time fields."""
+        filename_pattern = "{product:s}.A{start_time:%Y%j.%H%M}.{others:s}.{processing_time:s}.{data_format}"
+        filename = "MOD021KM.A2018358.1010.061.2018358192717.hdf"
+        result = parse_filename_pattern(filename, filename_pattern, time_only=True)
+        assert result == {
+            "start_time": datetime.datetime(2018, 12, 24, 10, 10),
+            "end_time": datetime.datetime(2018, 12, 24, 12, 10),
+        }
+
+    def test_time_only_invalid_filename_raises_error(self):
+        """Test that a filename not matching the pattern raises an error when parsing only the time fields."""
+        filename_pattern = "{start_date:%Y%m%d}-S{start_time:%H%M%S}-E{end_time:%H%M%S}"
+        with pytest.raises(ValueError, match="String does not match pattern"):
+            parse_filename_pattern("invalid_filename", filename_pattern, time_only=True)
+
     def test_missing_start_date_raises_error(self):
         """Test that missing start_date raises an error when start_time is time-only."""
         filename_pattern = "S{start_time:%H%M%S}-E{end_time:%H%M%S}"
@@ -79,3 +96,42 @@ class TestParseFilenamePattern:
         result = parse_filename_pattern(filename, filename_pattern)
         assert result["start_time"] == datetime.datetime(2024, 5, 1, 12, 0, 0)
         assert result["end_time"] == datetime.datetime(2024, 5, 1, 12 + 2, 0, 0)
+
+
+class TestGetKeyFromFilepaths:
+
+    def test_multiple_filepaths(self):
+        """Test extracting a key from multiple filepaths."""
+        filename_pattern = "{start_date:%Y%m%d}-S{start_time:%H%M%S}-E{end_time:%H%M%S}.{granule_id:d}"
+        filepaths = ["/data/20240501-S230000-E003000.1", "/data/20240502-S010000-E020000.2"]
+        assert get_key_from_filepaths(filepaths, key="granule_id", filename_pattern=filename_pattern) == [1, 2]
+        assert get_key_from_filepaths(filepaths, key="end_time", filename_pattern=filename_pattern) == [
+            datetime.datetime(2024, 5, 2, 0, 30, 0),
+            datetime.datetime(2024, 5, 2, 2, 0, 0),
+        ]
+
+    def test_multiple_filename_patterns(self):
+        """Test extracting a key when multiple filename patterns are specified."""
+        filename_patterns = ["{start_time:%Y%m%dT%H%M%S}-{end_time:%Y%m%dT%H%M%S}", "S{start_time:%Y%m%d%H%M%S}"]
+        filepaths = ["20240501T120000-20240501T123000", "S20240501120000"]
+        assert get_key_from_filepaths(filepaths, key="start_time", filename_pattern=filename_patterns) == [
+            datetime.datetime(2024, 5, 1, 12, 0, 0),
+            datetime.datetime(2024, 5, 1, 12, 0, 0),
+        ]
+
+    def test_invalid_filepath_raises_error(self):
+        """Test that a filepath not matching the filename pattern raises an error."""
+        filename_pattern = "{start_time:%Y%m%dT%H%M%S}-{end_time:%Y%m%dT%H%M%S}"
+        with pytest.raises(ValueError, match="Invalid pattern specified"):
+            get_key_from_filepaths(["invalid_filename"], key="start_time", filename_pattern=filename_pattern)
+
+
+def test_get_start_end_time_from_filepaths():
+    """Test extracting the start and end time of a list of filepaths."""
+    filename_pattern = "{start_date:%Y%m%d}-S{start_time:%H%M%S}-E{end_time:%H%M%S}"
+    filepaths = ["/data/20240501-S230000-E003000", "/data/20240502-S010000-E020000"]
+    start_times, end_times = get_start_end_time_from_filepaths(filepaths, filename_pattern=filename_pattern)
+    assert start_times.dtype == "datetime64[ns]"
+    assert end_times.dtype == "datetime64[ns]"
+    np.testing.assert_array_equal(start_times, np.array(["2024-05-01T23:00:00", "2024-05-02T01:00:00"], dtype="M8[ns]"))
+    np.testing.assert_array_equal(end_times, np.array(["2024-05-02T00:30:00", "2024-05-02T02:00:00"], dtype="M8[ns]"))
@@ -27,10 +27,15 @@
 """This module tests the bucket I/O utilities."""
 import os
 
+import pyarrow.parquet as pq
+import pytest
+
 from satbucket.io import (
     get_filepaths,
     get_filepaths_by_partition,
     get_partitions_paths,
+    read_bucket_manifest,
+    update_bucket_manifest,
     write_bucket_info,
 )
 from satbucket.partitioning import LonLatPartitioning
@@ -118,3 +123,34 @@ def test_get_filepaths_by_partition(tmp_path):
     assert sorted(dict_results) == sorted(expected_keys)
     assert len(dict_results[expected_keys[0]]) == 2
     assert len(dict_results[expected_keys[1]]) == 3
+
+
+def test_bucket_manifest(tmp_path):
+    bucket_dir = tmp_path
+    # Test empty manifest if not existing
+    assert read_bucket_manifest(bucket_dir=bucket_dir) == []
+    # Test filenames are appended to the manifest
+    update_bucket_manifest(bucket_dir=bucket_dir, filenames=["granule_1.HDF5"])
+    update_bucket_manifest(bucket_dir=bucket_dir, filenames=["granule_2.HDF5", "granule_3.HDF5"])
+    assert read_bucket_manifest(bucket_dir=bucket_dir) == ["granule_1.HDF5", "granule_2.HDF5", "granule_3.HDF5"]
+    # Test no temporary file is left in the bucket directory
+    assert os.listdir(bucket_dir) == ["_manifest.parquet"]
+
+
+def test_bucket_manifest_interrupted_update(tmp_path, monkeypatch):
+    bucket_dir = tmp_path
+    update_bucket_manifest(bucket_dir=bucket_dir, filenames=["granule_1.HDF5"])
+
+    # Simulate a failure while writing the new manifest
+    def write_table(table, where, **kwargs):
+        with open(where, "wb") as f:
+            f.write(b"PAR1")
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(pq, "write_table", write_table)
+    with pytest.raises(OSError, match="No space left on device"):
+        update_bucket_manifest(bucket_dir=bucket_dir, filenames=["granule_2.HDF5"])
+
+    # Test the previous manifest is left intact
+    assert read_bucket_manifest(bucket_dir=bucket_dir) == ["granule_1.HDF5"]
+    assert os.listdir(bucket_dir) == ["_manifest.parquet"]
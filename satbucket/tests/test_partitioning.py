@@ -43,6 +43,7 @@ from satbucket.partitioning import (
     get_bounds,
     get_n_decimals,
     query_indices,
+    query_regular_indices,
 )
 
 
@@ -132,6 +133,34 @@ class TestQueryIndices:
         assert np.all(comparison)
 
 
+class TestQueryRegularIndices:
+    """Test suite for the query_regular_indices function."""
+
+    @pytest.mark.parametrize(("size", "vmin", "vmax"), [(0.5, 0, 2), (0.1, -0.3, 0.75), (4, -180, 180), (0.3, 0, 1)])
+    def test_same_as_query_indices(self, size, vmin, vmax):
+        """Test query_regular_indices returns the same indices of query_indices."""
+        bounds = get_bounds(size=size, vmin=vmin, vmax=vmax)
+        rng = np.random.default_rng(0)
+        values = np.concatenate(
+            [
+                bounds,  # values on the bounds
+                bounds + 1e-12,
+                bounds - 1e-12,
+                rng.uniform(vmin - size, vmax + size, 1000),
+                [np.nan, np.inf, -np.inf],
+            ],
+        )
+        result = query_regular_indices(values, bounds=bounds, size=size)
+        expected = query_indices(values, bounds=bounds)
+        np.testing.assert_array_equal(result, expected)
+
+    def test_all_valid_values(self):
+        """Test integer indices are returned if all values are within the bounds."""
+        result = query_regular_indices([0.0, 2.0, 2.5, 4.0], bounds=np.array([0, 2, 4]), size=2)
+        assert result.dtype.kind == "i"
+        np.testing.assert_array_equal(result, [0, 0, 1, 1])
+
+
 class TestXYPartitioning:
     """Tests for the XYPartitioning class."""
 
@@ -396,7 +425,7 @@ class TestXYPartitioning:
         with pytest.raises(ValueError):
             partitioning.add_labels(df=df, x="x", y="invalid_y")
 
-    @pytest.mark.parametrize("df_type", ["pandas", "polars"])
+    @pytest.mark.parametrize("df_type", ["pandas", "polars", "pyarrow"])
     def test_add_labels_invalid_values(self, df_type):
         """Test error is raised if invalid values are present in the dataframe."""
         # Create test pandas.DataFrame
@@ -419,6 +448,11 @@ class TestXYPartitioning:
             df_out_of_extent_values = pl.DataFrame(df_out_of_extent_values)
             df_null_values = pl.DataFrame(df_null_values)
 
+        # Convert to pyarrow.Table
+        if df_type == "pyarrow":
+            df_out_of_extent_values = pa.Table.from_pandas(df_out_of_extent_values)
+            df_null_values = pa.Table.from_pandas(df_null_values)
+
         # Create partitioning
         size = (0.5, 0.25)
         extent = [0, 2, 0, 2]
@@ -1318,6 +1352,32 @@ class TestTilePartitioning:
         expected_ids = ["28", "28", "24", "17", "10", "3"]
         assert df_out["tile"].astype(str).tolist() == expected_ids, "Tile ids are incorrect."
 
+    def test_add_labels_single_level_pyarrow(self):
+        """Test valid partitions are added to a pyarrow table."""
+        # Create test table
+        df = pa.table(
+            {
+                "x": [-0.001, -0.0, 0, 0.5, 1.0, 1.5, 2.0, 2.1, np.nan],
+                "y": [-0.001, -0.0, 0, 0.5, 1.0, 1.5, 2.0, 2.1, np.nan],
+            },
+        )
+        # Create partitioning
+        size = (0.5, 0.25)
+        extent = [0, 2, 0, 2]
+        n_levels = 1
+        partitioning = TilePartitioning(
+            size=size,
+            extent=extent,
+            n_levels=n_levels,
+        )
+        # Add partitions
+        df_out = partitioning.add_labels(df, x="x", y="y", remove_invalid_rows=True)
+        # Test results
+        assert isinstance(df_out, pa.Table)
+        assert df_out["tile"].type == pa.string()
+        expected_ids = ["28", "28", "24", "17", "10", "3"]
+        assert df_out["tile"].to_pylist() == expected_ids, "Tile ids are incorrect."
+
     def test_to_dict_xy(self):
         """Test to dict."""
         size = (120, 90)  # 3x2 partitions
@@ -26,17 +26,25 @@
 # -----------------------------------------------------------------------------.
 """This module tests the bucket routines."""
 import os
+import time
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
+from dask.distributed import Client, LocalCluster
 
+import satbucket.routines
 from satbucket import LonLatPartitioning
 from satbucket.info import get_key_from_filepath
+from satbucket.io import read_bucket_manifest
 from satbucket.readers import read_dask_partitioned_dataset
 from satbucket.routines import (
     check_temporal_partitioning,
     get_partitioning_boundaries,
+    get_template_table,
     get_time_prefix,
+    group_files_by_time,
     merge_granule_buckets,
     write_bucket,
     write_granules_bucket,
@@ -102,6 +110,21 @@ def test_write_bucket(tmp_path, df_type):
         )
 
 
+def test_write_bucket_with_existing_labels(tmp_path):
+    """Test write_bucket does not recompute the partitions labels if already present."""
+    df = create_granule_dataframe(df_type="pandas")
+    spatial_partitioning = LonLatPartitioning(size=(10, 10))
+    df = spatial_partitioning.add_labels(df=df, x="lon", y="lat")
+    df["lon_bin"] = "dummy"
+    write_bucket(
+        df=df,
+        bucket_dir=tmp_path,
+        spatial_partitioning=spatial_partitioning,
+        filename_prefix="filename_prefix",
+    )
+    assert os.path.exists(os.path.join(tmp_path, "lon_bin=dummy", "lat_bin=5.0", "filename_prefix_0.parquet"))
+
+
 @pytest.mark.parametrize("order", [["lon_bin", "lat_bin"], ["lat_bin", "lon_bin"]])
 @pytest.mark.parametrize("flavor", ["hive", None])
 def test_write_granules_bucket(tmp_path, order, flavor):
@@ -215,10 +238,123 @@ def test_write_granules_bucket_capture_error(tmp_path, capsys):
     assert "check_this_error_captured" in captured.out, "Expected error message not printed"
 
 
+@pytest.mark.parametrize("batch_size", [1, 2, 5])
+def test_write_granules_bucket_batch_size(tmp_path, capsys, batch_size):
+    """Test write_granules_bucket processes all granules and errors when batching."""
+    bucket_dir = tmp_path
+
+    # Define filepaths
+    filepaths = [
+        "2A.GPM.DPR.V9-20211125.20210705-S013942-E031214.041760.V07A.HDF5",
+        "2A.GPM.DPR.V9-20211125.20210805-S013942-E031214.041760.V07A.HDF5",
+        "2A.GPM.DPR.V9-20211125.20230705-S013942-E031214.041760.V07A.HDF5",
+    ]
+
+    # Define spatial partitioning
+    spatial_partitioning = LonLatPartitioning(size=(10, 10))
+
+    # Define granule_to_df_func failing on one granule
+    def granule_to_df_func(filepath):
+        if filepath == filepaths[1]:
+            raise ValueError("check_this_error_captured")
+        return granule_to_df_toy_func(filepath)
+
+    # Run processing
+    write_granules_bucket(
+        # Bucket Input/Output configuration
+        filepaths=filepaths,
+        bucket_dir=bucket_dir,
+        spatial_partitioning=spatial_partitioning,
+        granule_to_df_func=granule_to_df_func,
+        # Processing options
+        parallel=False,
+        max_dask_total_tasks=1,
+        batch_size=batch_size,
+    )
+    captured = capsys.readouterr()
+    assert f"An error occurred while processing {filepaths[1]}" in captured.out
+
+    # Check the other granules have been written
+    partition_dir = os.path.join(bucket_dir, "lon_bin=-5.0", "lat_bin=5.0")
+    expected_filenames = [os.path.splitext(f)[0] + "_0.parquet" for f in [filepaths[0], filepaths[2]]]
+    assert sorted(os.listdir(partition_dir)) == sorted(expected_filenames)
+
+
+def test_write_granules_bucket_arrow_table(tmp_path):
+    """Test write_granules_bucket routine with granule_to_df_func returning a pyarrow.Table."""
+    # Define bucket dir
+    bucket_dir = tmp_path
+
+    # Define filepaths
+    filepaths = [
+        "2A.GPM.DPR.V9-20211125.20210705-S013942-E031214.041760.V07A.HDF5",
+        "2A.GPM.DPR.V9-20211125.20230705-S013942-E031214.041760.V07A.HDF5",
+    ]
+
+    # Define granule_to_df_func returning a pyarrow.Table
+    def granule_to_df_func(filepath):
+        return pa.Table.from_pandas(granule_to_df_toy_func(filepath), preserve_index=False)
+
+    # Run processing
+    write_granules_bucket(
+        filepaths=filepaths,
+        bucket_dir=bucket_dir,
+        spatial_partitioning=LonLatPartitioning(size=(10, 10)),
+        granule_to_df_func=granule_to_df_func,
+        parallel=False,
+    )
+
+    # Check parquet files named by granule
+    partition_dir = os.path.join(bucket_dir, "lon_bin=-5.0", "lat_bin=5.0")
+    expected_filenames = [os.path.splitext(f)[0] + "_0.parquet" for f in filepaths]
+    assert sorted(os.listdir(partition_dir)) == sorted(expected_filenames)
+
+
+def test_write_granules_bucket_skip_processed(tmp_path):
+    """Test write_granules_bucket skips the granules recorded in the bucket manifest."""
+    # Define bucket dir
+    bucket_dir = tmp_path
+
+    # Define filepaths
+    filepaths = [
+        "2A.GPM.DPR.V9-20211125.20210705-S013942-E031214.041760.V07A.HDF5",
+        "2A.GPM.DPR.V9-20211125.20210805-S013942-E031214.041760.V07A.HDF5",
+        "2A.GPM.DPR.V9-20211125.20230705-S013942-E031214.041760.V07A.HDF5",
+    ]
+
+    # Define granule_to_df_func recording the processed granules and failing on one granule
+    processed_filepaths = []
+    failing_filepaths = [filepaths[1]]
+
+    def granule_to_df_func(filepath):
+        processed_filepaths.append(filepath)
+        if filepath in failing_filepaths:
+            raise ValueError("Corrupted granule.")
+        return granule_to_df_toy_func(filepath)
+
+    kwargs = {
+        "bucket_dir": bucket_dir,
+        "spatial_partitioning": LonLatPartitioning(size=(10, 10)),
+        "granule_to_df_func": granule_to_df_func,
+        "parallel": False,
+        "skip_processed": True,
+    }
+
+    # Run processing
+    write_granules_bucket(filepaths=filepaths, **kwargs)
+    assert processed_filepaths == filepaths
+    assert sorted(read_bucket_manifest(bucket_dir)) == sorted([filepaths[0], filepaths[2]])
+
+    # Check only the failed granule is processed again
+    processed_filepaths.clear()
+    failing_filepaths.clear()
+    write_granules_bucket(filepaths=filepaths, **kwargs)
+    assert processed_filepaths == [filepaths[1]]
+    assert sorted(read_bucket_manifest(bucket_dir)) == sorted(filepaths)
+
+
 def test_write_granules_bucket_parallel(tmp_path):
     """Test write_granules_bucket routine with dask distributed client."""
-    from dask.distributed import Client, LocalCluster
-
     # Define bucket dir
     bucket_dir = tmp_path
 
@@ -233,6 +369,7 @@ def test_write_granules_bucket_parallel(tmp_path):
     parallel = True
     max_concurrent_tasks = None
     max_dask_total_tasks = 2
+    batch_size = 2
 
     # Define spatial partitioning
     spatial_partitioning = LonLatPartitioning(size=(10, 10))
@@ -256,6 +393,7 @@ def test_write_granules_bucket_parallel(tmp_path):
         parallel=parallel,
         max_concurrent_tasks=max_concurrent_tasks,
         max_dask_total_tasks=max_dask_total_tasks,
+        batch_size=batch_size,
     )
 
     # Close Dask Distributed client
@@ -271,7 +409,52 @@ def test_write_granules_bucket_parallel(tmp_path):
     assert expected_directories == sorted(os.listdir(bucket_dir))
 
 
-def test_merge_granule_buckets(tmp_path):
+def test_write_granules_bucket_parallel_bounded_submission(tmp_path):
+    """Test write_granules_bucket submits new dask tasks as soon as tasks complete."""
+    # Define bucket dir
+    bucket_dir = tmp_path
+
+    # Define filepaths
+    filepaths = [
+        "2A.GPM.DPR.V9-20211125.20210705-S013942-E031214.041760.V07A.HDF5",
+        "2A.GPM.DPR.V9-20211125.20210805-S013942-E031214.041760.V07A.HDF5",
+        "2A.GPM.DPR.V9-20211125.20230705-S013942-E031214.041760.V07A.HDF5",
+    ]
+
+    # Create Dask Distributed LocalCluster
+    cluster = LocalCluster(n_workers=1, threads_per_worker=1, processes=False, dashboard_address=None)
+    client = Client(cluster)
+
+    # Run processing with a single task submitted at a time
+    write_granules_bucket(
+        filepaths=filepaths,
+        bucket_dir=bucket_dir,
+        spatial_partitioning=LonLatPartitioning(size=(10, 10)),
+        granule_to_df_func=granule_to_df_toy_func,
+        parallel=True,
+        max_concurrent_tasks=1,
+        max_dask_total_tasks=2,
+        batch_size=1,
+        skip_processed=True,
+    )
+
+    # Close Dask Distributed client
+    client.close()
+    cluster.close()
+
+    # Check all granules have been processed
+    assert sorted(read_bucket_manifest(bucket_dir)) == sorted(filepaths)
+    assert sorted(os.listdir(bucket_dir)) == [
+        "_manifest.parquet",
+        "bucket_info.yaml",
+        "lon_bin=-5.0",
+        "lon_bin=15.0",
+        "lon_bin=5.0",
+    ]
+
+
+@pytest.mark.parametrize("max_concurrent_partitions", [1, 2])
+def test_merge_granule_buckets(tmp_path, max_concurrent_partitions):
     """Test merge_granule_buckets routine."""
     # Define bucket dir
     src_bucket_dir = tmp_path / "src"
@@ -307,6 +490,7 @@ def test_merge_granule_buckets(tmp_path):
         dst_bucket_dir=dst_bucket_dir,
         filename_pattern=filename_pattern,
         write_metadata=True,
+        max_concurrent_partitions=max_concurrent_partitions,
     )
 
     # Check file naming
@@ -317,11 +501,76 @@ def test_merge_granule_buckets(tmp_path):
     assert os.path.exists(os.path.join(dst_bucket_dir, "_common_metadata"))
     assert os.path.exists(os.path.join(dst_bucket_dir, "_metadata"))
 
+    # Check the _metadata file refers to the row groups of all written files
+    dst_filepaths = sorted(
+        os.path.relpath(os.path.join(root, filename), dst_bucket_dir)
+        for root, _, filenames in os.walk(dst_bucket_dir)
+        for filename in filenames
+        if filename.endswith(".parquet")
+    )
+    metadata = pq.read_metadata(os.path.join(dst_bucket_dir, "_metadata"))
+    metadata_filepaths = [metadata.row_group(i).column(0).file_path for i in range(metadata.num_row_groups)]
+    assert sorted(set(metadata_filepaths)) == dst_filepaths
+    assert metadata.num_row_groups == sum(
+        pq.read_metadata(os.path.join(dst_bucket_dir, filepath)).num_row_groups for filepath in dst_filepaths
+    )
+    assert metadata.num_rows == sum(
+        pq.read_metadata(os.path.join(dst_bucket_dir, filepath)).num_rows for filepath in dst_filepaths
+    )
+
     # Assert can be read with Dask too without errors
     df = read_dask_partitioned_dataset(base_dir=dst_bucket_dir)
     assert isinstance(df.compute(), pd.DataFrame)
 
 
+def test_merge_granule_buckets_concurrent_error(tmp_path, monkeypatch):
+    """Test merge_granule_buckets cancels the pending partitions when a partition fails."""
+    # Define bucket dir
+    src_bucket_dir = tmp_path / "src"
+    dst_bucket_dir = tmp_path / "dst"
+
+    # Define filepaths
+    filepaths = ["2A.GPM.DPR.V9-20211125.20210705-S013942-E031214.041760.V07A.HDF5"]
+
+    # Define filename pattern
+    filename_pattern = "{product_level:s}.{satellite:s}.{sensor:s}.{algorithm:s}.{start_time:%Y%m%d-S%H%M%S}-E{end_time:%H%M%S}.{granule_id}.{version}.{data_format}"  # noqa
+
+    # Run processing
+    write_granules_bucket(
+        filepaths=filepaths,
+        bucket_dir=src_bucket_dir,
+        spatial_partitioning=LonLatPartitioning(size=(2, 2)),
+        granule_to_df_func=granule_to_df_toy_func,
+        parallel=False,
+    )
+
+    # Make the merging of the first partition fail, and the others slow
+    list_partition_labels = []
+
+    def merge_partition(partition_label, list_src_partition_dir, **kwargs):
+        list_partition_labels.append(partition_label)
+        if len(list_partition_labels) == 1:
+            raise ValueError("Partition merging failed.")
+        time.sleep(0.2)
+        return []
+
+    monkeypatch.setattr(satbucket.routines, "_merge_partition", merge_partition)
+
+    # Merge granules
+    with pytest.raises(ValueError, match="Partition merging failed"):
+        merge_granule_buckets(
+            src_bucket_dir=src_bucket_dir,
+            dst_bucket_dir=dst_bucket_dir,
+            filename_pattern=filename_pattern,
+            max_concurrent_partitions=2,
+        )
+
+    # Check the pending partitions have not been merged
+    n_partitions = sum(1 for _, dirs, files in os.walk(src_bucket_dir) if files and not dirs)
+    assert n_partitions > 4
+    assert len(list_partition_labels) <= 3
+
+
 def test_merge_granule_buckets_update(tmp_path):
     """Test merge_granule_buckets routine."""
     # Define bucket dir
@@ -393,6 +642,52 @@ def test_merge_granule_buckets_update(tmp_path):
     assert sorted(os.listdir(partition_dir)) == sorted(expected_filenames)
 
 
+def test_merge_granule_buckets_update_month(tmp_path):
+    """Test merge_granule_buckets update only replaces the files of the updated months."""
+    # Define bucket dir
+    src_bucket_dir = tmp_path / "src"
+    dst_bucket_dir = tmp_path / "dst"
+
+    # Define filepaths
+    filepaths = [
+        "2A.GPM.DPR.V9-20211125.20210105-S013942-E031214.041760.V07A.HDF5",  # 2021_1
+        "2A.GPM.DPR.V9-20211125.20211005-S013942-E031214.041760.V07A.HDF5",  # 2021_10
+    ]
+    # Define filename pattern
+    filename_pattern = "{product_level:s}.{satellite:s}.{sensor:s}.{algorithm:s}.{start_time:%Y%m%d-S%H%M%S}-E{end_time:%H%M%S}.{granule_id}.{version}.{data_format}"  # noqa
+
+    # Create granules buckets and merge them
+    spatial_partitioning = LonLatPartitioning(size=(10, 10))
+    write_granules_bucket(
+        filepaths=filepaths,
+        bucket_dir=src_bucket_dir,
+        spatial_partitioning=spatial_partitioning,
+        granule_to_df_func=granule_to_df_toy_func,
+        parallel=False,
+    )
+    merge_granule_buckets(
+        src_bucket_dir=src_bucket_dir,
+        dst_bucket_dir=dst_bucket_dir,
+        filename_pattern=filename_pattern,
+        temporal_partitioning="month",
+    )
+
+    # Update January 2021
+    merge_granule_buckets(
+        src_bucket_dir=src_bucket_dir,
+        dst_bucket_dir=dst_bucket_dir,
+        filename_pattern=filename_pattern,
+        update=True,
+        start_time="2021-01-01",
+        end_time="2021-02-01",
+    )
+
+    # Check the October 2021 file has not been removed
+    partition_dir = os.path.join(dst_bucket_dir, "lon_bin=-5.0", "lat_bin=5.0")
+    expected_filenames = ["2021_1_0.parquet", "2021_10_0.parquet"]
+    assert sorted(os.listdir(partition_dir)) == sorted(expected_filenames)
+
+
 class TestMergeGranuleBucketsErrors:
     def test_dst_bucket_does_not_exist(self, tmp_path):
         """Test that OSError is raised when destination bucket directory does not exist in update mode."""
@@ -461,6 +756,24 @@ class TestMergeGranuleBucketsErrors:
 
 ####----------------------------------------------------------------------.
 #### Test routines inner function
+def test_get_template_table(tmp_path):
+    """Test the template table is read from the first non-empty partition."""
+    dict_partitions = {}
+    for i, partition in enumerate(["empty", "first", "second"]):
+        partition_dir = tmp_path / partition
+        partition_dir.mkdir()
+        if partition != "empty":
+            pq.write_table(pa.table({"value": [i]}), partition_dir / "part_0.parquet")
+        dict_partitions[partition] = [str(partition_dir)]
+
+    template_table = get_template_table(dict_partitions)
+    assert template_table.column("value").to_pylist() == [1]
+
+    # Test raise error if all partitions are empty
+    with pytest.raises(ValueError, match="No file found"):
+        get_template_table({"empty": [str(tmp_path / "empty")]})
+
+
 class TestGetPartitioningBoundaries:
     def test_year_partitioning(self):
         """Test yearly boundaries are aligned to January 1 when end time is not aligned."""
@@ -637,3 +950,41 @@ class TestCheckTemporalPartitioning:
         """Test that a non-string input raises a TypeError."""
         with pytest.raises(TypeError):
             check_temporal_partitioning(2021)
+
+
+class TestGroupFilesByTime:
+    filename_pattern = "{product_level:s}.{satellite:s}.{sensor:s}.{algorithm:s}.{start_time:%Y%m%d-S%H%M%S}-E{end_time:%H%M%S}.{granule_id}.{version}.{data_format}"  # noqa
+
+    def test_file_spanning_groups(self):
+        """Test that a file spanning two time groups is assigned to both groups."""
+        filepaths = [
+            "2A.GPM.DPR.V9-20211125.20211231-S230000-E010000.041760.V07A.HDF5",  # 2021 and 2022
+            "2A.GPM.DPR.V9-20211125.20210705-S013942-E031214.041760.V07A.HDF5",  # 2021
+            "2A.GPM.DPR.V9-20211125.20220705-S013942-E031214.041760.V07A.HDF5",  # 2022
+        ]
+        groups_dict = group_files_by_time(
+            filepaths=filepaths,
+            start_time=None,
+            end_time=None,
+            temporal_partitioning="year",
+            filename_pattern=self.filename_pattern,
+        )
+        assert list(groups_dict) == ["2021", "2022"]
+        assert groups_dict["2021"][2].tolist() == [filepaths[0], filepaths[1]]
+        assert groups_dict["2022"][2].tolist() == [filepaths[0], filepaths[2]]
+
+    def test_files_outside_time_period(self):
+        """Test that files outside the time period are discarded."""
+        filepaths = [
+            "2A.GPM.DPR.V9-20211125.20210705-S013942-E031214.041760.V07A.HDF5",
+            "2A.GPM.DPR.V9-20211125.20230705-S013942-E031214.041760.V07A.HDF5",
+        ]
+        groups_dict = group_files_by_time(
+            filepaths=filepaths,
+            start_time=pd.Timestamp("2023-01-01"),
+            end_time=pd.Timestamp("2024-01-01"),
+            temporal_partitioning="month",
+            filename_pattern=self.filename_pattern,
+        )
+        assert list(groups_dict) == ["2023_7"]
+        assert groups_dict["2023_7"][2].tolist() == [filepaths[1]]
@@ -0,0 +1,142 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from satbucket.utils.time import has_nat, interpolate_nat, is_nat, regularize_dataset
+
+NaT = np.datetime64("NaT")
+
+
+def interpolate_nat_with_pandas(timesteps, **kwargs):
+    """Interpolate NaT values with pandas.Series.interpolate."""
+    timesteps_num = timesteps.astype(float)
+    timesteps_num[np.isnat(timesteps)] = np.nan
+    series = pd.Series(timesteps_num).interpolate(**kwargs)
+    return series.to_numpy().astype(timesteps.dtype)
+
+
+class TestIsNat:
+
+    @pytest.mark.parametrize("unit", ["ns", "s"])
+    def test_datetime64(self, unit):
+        """Test NaT detection in datetime64 arrays."""
+        timesteps = np.array(["2020-01-01", NaT, "2020-01-03"], dtype=f"datetime64[{unit}]")
+        np.testing.assert_array_equal(is_nat(timesteps), [False, True, False])
+        assert has_nat(timesteps)
+        assert not has_nat(timesteps[[0, 2]])
+
+    def test_timedelta64(self):
+        """Test NaT detection in timedelta64 arrays."""
+        timedeltas = np.array([1, "NaT", 3], dtype="timedelta64[s]")
+        np.testing.assert_array_equal(is_nat(timedeltas), [False, True, False])
+        assert has_nat(timedeltas)
+
+    def test_datetime64_scalar(self):
+        """Test NaT detection of a datetime64 scalar."""
+        assert is_nat(NaT)
+        assert not is_nat(np.datetime64("2020-01-01"))
+
+    def test_object_array(self):
+        """Test NaT detection in object arrays falls back to pandas."""
+        timesteps = np.array([datetime.datetime(2020, 1, 1), None, pd.NaT], dtype=object)
+        np.testing.assert_array_equal(is_nat(timesteps), [False, True, True])
+        assert has_nat(timesteps)
+        assert not has_nat(timesteps[:1])
+
+
+class TestInterpolateNat:
+
+    @pytest.mark.parametrize("limit", [None, 1, 2])
+    @pytest.mark.parametrize("limit_area", [None, "inside", "outside"])
+    @pytest.mark.parametrize("limit_direction", [None, "forward", "both"])
+    @pytest.mark.parametrize(
+        "timesteps",
+        [
+            # NaTs within valid values
+            ["2020-01-01T00", NaT, NaT, NaT, "2020-01-01T04", NaT, "2020-01-01T06"],
+            # Leading and trailing NaTs
+            [NaT, NaT, "2020-01-01T02", NaT, "2020-01-01T04", NaT, NaT, NaT],
+            # Single valid value
+            [NaT, "2020-01-01T01", NaT],
+            # No NaT
+            ["2020-01-01T00", "2020-01-01T01", "2020-01-01T02"],
+            # Only NaT
+            [NaT, NaT, NaT],
+        ],
+    )
+    def test_same_as_pandas(self, timesteps, limit, limit_area, limit_direction):
+        """Test interpolate_nat fills NaT values as pandas.Series.interpolate."""
+        timesteps = np.array(timesteps, dtype="datetime64[ns]")
+        kwargs = {"method": "linear", "limit": limit, "limit_area": limit_area, "limit_direction": limit_direction}
+        expected = interpolate_nat_with_pandas(timesteps, **kwargs)
+        result = interpolate_nat(timesteps, **kwargs)
+        assert result.dtype == timesteps.dtype
+        np.testing.assert_array_equal(result, expected)
+
+    def test_interpolated_values(self):
+        """Test interpolate_nat linearly interpolates NaT values."""
+        timesteps = np.array(["2020-01-01T00", NaT, NaT, "2020-01-01T03", NaT], dtype="datetime64[ns]")
+        result = interpolate_nat(timesteps, limit=None, limit_area="inside")
+        expected = np.array(
+            ["2020-01-01T00", "2020-01-01T01", "2020-01-01T02", "2020-01-01T03", NaT],
+            dtype="datetime64[ns]",
+        )
+        np.testing.assert_array_equal(result, expected)
+
+    def test_empty_timesteps(self):
+        """Test interpolate_nat returns empty timesteps as is."""
+        timesteps = np.array([], dtype="datetime64[ns]")
+        assert interpolate_nat(timesteps).size == 0
+
+
+class TestRegularizeDataset:
+
+    def create_dataset(self, timesteps):
+        """Create a dataset with a float and an integer variable along time."""
+        n_timesteps = len(timesteps)
+        return xr.Dataset(
+            {
+                "float_var": ("time", np.arange(n_timesteps, dtype=float)),
+                "int_var": ("time", np.arange(n_timesteps, dtype="int16")),
+            },
+            coords={"time": pd.DatetimeIndex(timesteps)},
+        )
+
+    def reindex_dataset(self, ds, freq):
+        """Regularize the dataset with xarray.Dataset.reindex."""
+        new_time_index = pd.date_range(start=ds["time"].to_numpy()[0], end=ds["time"].to_numpy()[-1], freq=freq)
+        fill_value = {"float_var": np.nan, "int_var": np.iinfo("int16").max}
+        return ds.reindex({"time": new_time_index}, fill_value=fill_value)
+
+    def test_regular_dataset(self):
+        """Test a dataset with regular timesteps is returned as is."""
+        ds = self.create_dataset(pd.date_range("2020-01-01", periods=5, freq="2min"))
+        ds_regular = regularize_dataset(ds, freq="2min")
+        assert ds_regular is ds
+        xr.testing.assert_identical(ds_regular, self.reindex_dataset(ds, freq="2min"))
+
+    def test_regular_dataset_at_other_frequency(self):
+        """Test a dataset with regular timesteps is reindexed at a different frequency."""
+        ds = self.create_dataset(pd.date_range("2020-01-01", periods=5, freq="2min"))
+        ds_regular = regularize_dataset(ds, freq="1min")
+        assert ds_regular.sizes["time"] == 9
+        xr.testing.assert_identical(ds_regular, self.reindex_dataset(ds, freq="1min"))
+
+    def test_gapped_dataset(self):
+        """Test the missing timesteps of a dataset are filled."""
+        ds = self.create_dataset(pd.date_range("2020-01-01", periods=5, freq="2min")[[0, 1, 3, 4]])
+        ds_regular = regularize_dataset(ds, freq="2min")
+        assert ds_regular.sizes["time"] == 5
+        assert np.isnan(ds_regular["float_var"].to_numpy()[2])
+        assert ds_regular["int_var"].to_numpy()[2] == np.iinfo("int16").max
+        xr.testing.assert_identical(ds_regular, self.reindex_dataset(ds, freq="2min"))
+
+    def test_non_fixed_frequency(self):
+        """Test a dataset is regularized with a non-fixed frequency."""
+        ds = self.create_dataset(pd.DatetimeIndex(["2020-01-01", "2020-02-01", "2020-04-01"]))
+        ds_regular = regularize_dataset(ds, freq="MS")
+        assert ds_regular.sizes["time"] == 4
+        xr.testing.assert_identical(ds_regular, self.reindex_dataset(ds, freq="MS"))
@@ -37,7 +37,62 @@ import pytest
 
 from satbucket.readers import read_dask_partitioned_dataset
 from satbucket.tests.utils.fake_datasets import get_orbit_dataarray
-from satbucket.writers import convert_size_to_bytes, estimate_row_group_size, write_partitioned_dataset
+from satbucket.writers import (
+    convert_size_to_bytes,
+    estimate_row_group_size,
+    get_byte_stream_split_columns,
+    get_dictionary_encoded_columns,
+    write_partitioned_dataset,
+)
+
+
+def test_get_dictionary_encoded_columns():
+    """Test the dictionary-encoded columns exclude the BYTE_STREAM_SPLIT encoded columns."""
+    table = pa.table({"a": [1.0], "b": [2.0], "c": ["x"]})
+    assert get_dictionary_encoded_columns(table, use_byte_stream_split=False) is True
+    assert get_dictionary_encoded_columns(table, use_byte_stream_split=True) == ["c"]
+    assert get_dictionary_encoded_columns(table, use_byte_stream_split=["a"]) == ["b", "c"]
+    assert get_dictionary_encoded_columns(table.to_pandas(), use_byte_stream_split=["a", "b"]) == ["c"]
+
+
+@pytest.mark.parametrize("df_type", ["pyarrow", "pandas", "polars"])
+def test_get_byte_stream_split_columns(df_type):
+    """Test use_byte_stream_split=True selects only the floating point columns."""
+    convert_table = {"pyarrow": lambda table: table, "pandas": pa.Table.to_pandas, "polars": pl.from_arrow}[df_type]
+    table = pa.table({"a": [1.0], "b": pa.array([2.0], pa.float32()), "c": ["x"], "d": [True], "e": [1]})
+    df = convert_table(table)
+    assert get_byte_stream_split_columns(df, use_byte_stream_split=True) == ["a", "b"]
+    assert get_byte_stream_split_columns(df, use_byte_stream_split=False) is False
+    assert get_byte_stream_split_columns(df, use_byte_stream_split=["b"]) == ["b"]
+    df = convert_table(table.select(["c", "d", "e"]))
+    assert get_byte_stream_split_columns(df, use_byte_stream_split=True) is False
+
+
+def test_byte_stream_split_mixed_table(tmp_path):
+    """Test use_byte_stream_split=True encodes the floating point columns of a table with other column types."""
+    table = pa.table(
+        {
+            "float_var": np.arange(100, dtype="float32"),
+            "double_var": np.arange(100, dtype="float64"),
+            "string_var": ["a", "b"] * 50,
+            "bool_var": [True, False] * 50,
+        },
+    )
+    write_partitioned_dataset(
+        table,
+        base_dir=tmp_path,
+        filename_prefix="prefix",
+        partitions=None,
+        use_byte_stream_split=True,
+    )
+    parquet_file = pq.ParquetFile(os.path.join(tmp_path, "prefix_0.parquet"))
+    row_group = parquet_file.metadata.row_group(0)
+    encodings = {row_group.column(i).path_in_schema: row_group.column(i).encodings for i in range(4)}
+    assert "BYTE_STREAM_SPLIT" in encodings["float_var"]
+    assert "BYTE_STREAM_SPLIT" in encodings["double_var"]
+    assert "BYTE_STREAM_SPLIT" not in encodings["string_var"]
+    assert "RLE_DICTIONARY" in encodings["string_var"]
+    assert "BYTE_STREAM_SPLIT" not in encodings["bool_var"]
 
 
 def test_filesize_conversions():
@@ -185,6 +240,37 @@ class TestWritePandasPartitionedDataset:
         assert parquet_file.metadata.row_group(0).column(0).compression == "LZ4"
         assert parquet_file.metadata.row_group(0).column(0).statistics is None
 
+    def test_per_column_compression(self, tmp_path):
+        # Create pandas dataframe
+        da = get_orbit_dataarray(
+            start_lon=0,
+            start_lat=0,
+            end_lon=10,
+            end_lat=20,
+            width=1e6,
+            n_along_track=10,
+            n_cross_track=5,
+        )
+        ds = da.to_dataset(name="dummy_var")
+        df = ds.gpm.to_pandas_dataframe()
+
+        # Test per-column compression with byte stream split encoding
+        write_partitioned_dataset(
+            df,
+            base_dir=tmp_path,
+            filename_prefix="prefix",
+            partitions=None,
+            compression={"dummy_var": "zstd", "lon": "lz4"},
+            use_byte_stream_split=["dummy_var"],
+        )
+        parquet_file = pq.ParquetFile(os.path.join(tmp_path, "prefix_0.parquet"))
+        column_names = parquet_file.schema_arrow.names
+        row_group = parquet_file.metadata.row_group(0)
+        assert row_group.column(column_names.index("dummy_var")).compression == "ZSTD"
+        assert row_group.column(column_names.index("lon")).compression == "LZ4"
+        assert "BYTE_STREAM_SPLIT" in row_group.column(column_names.index("dummy_var")).encodings
+        assert "BYTE_STREAM_SPLIT" not in row_group.column(column_names.index("lon")).encodings
+
     def test_write_statistics(self, tmp_path):
         # Create pandas dataframe
         da = get_orbit_dataarray(
@@ -210,6 +296,33 @@ class TestWritePandasPartitionedDataset:
         parquet_file = pq.ParquetFile(os.path.join(tmp_path, "prefix_0.parquet"))
         assert parquet_file.metadata.row_group(0).column(0).statistics is not None
 
+    def test_write_page_index(self, tmp_path):
+        # Create pandas dataframe
+        da = get_orbit_dataarray(
+            start_lon=0,
+            start_lat=0,
+            end_lon=10,
+            end_lat=20,
+            width=1e6,
+            n_along_track=10,
+            n_cross_track=5,
+        )
+        ds = da.to_dataset(name="dummy_var")
+        df = ds.gpm.to_pandas_dataframe()
+
+        # Write page index
+        write_partitioned_dataset(
+            df,
+            base_dir=tmp_path,
+            filename_prefix="prefix",
+            partitions=None,
+            write_statistics=True,
+            write_page_index=True,
+        )
+        parquet_file = pq.ParquetFile(os.path.join(tmp_path, "prefix_0.parquet"))
+        assert parquet_file.metadata.row_group(0).column(0).has_column_index
+        assert parquet_file.metadata.row_group(0).column(0).has_offset_index
+
     def test_write_metadata_with_partitions(self, tmp_path):
         # Create dask dataframe
         da = get_orbit_dataarray(
@@ -4,6 +4,8 @@ import pyproj
 import xarray as xr
 from gpm.dataset.crs import set_dataset_crs
 
+GEOD = pyproj.Geod(ellps="sphere")
+
 
 def get_geodesic_path(
     start_lon: float,
@@ -11,11 +13,14 @@ def get_geodesic_path(
     end_lon: float,
     end_lat: float,
     n_points: int,
-    offset_distance: float = 0,
+    offset_distance: float | np.ndarray = 0,
 ) -> tuple[np.ndarray, np.ndarray]:
-    """Compute geodesic path between starting and ending coordinates."""
-    geod = pyproj.Geod(ellps="sphere")
-    r = geod.inv_intermediate(
+    """Compute geodesic path between starting and ending coordinates.
+
+    If ``offset_distance`` is an array, the path is offset orthogonally by each distance
+    and the coordinates arrays have shape ``(len(offset_distance), n_points)``.
+    """
+    r = GEOD.inv_intermediate(
         start_lon,
         start_lat,
         end_lon,
@@ -27,15 +32,25 @@ def get_geodesic_path(
         flags=pyproj.enums.GeodIntermediateFlag.AZIS_KEEP,
     )
 
-    orthogonal_directions = np.array(r.azis) + 90
-
-    if offset_distance != 0:
-        geod.fwd(r.lons, r.lats, orthogonal_directions, [offset_distance] * n_points, inplace=True)
-
     # Convert into numpy arrays
     lon = np.array(r.lons)
     lat = np.array(r.lats)
 
+    offsets = np.asarray(offset_distance, dtype=float)
+    if offsets.ndim == 0 and offsets == 0:
+        return lon, lat
+
+    # Offset the geodesic path orthogonally for all offsets at once
+    orthogonal_directions = np.array(r.azis) + 90
+    n_offsets = offsets.size
+    lon, lat, _ = GEOD.fwd(
+        np.tile(lon, n_offsets),
+        np.tile(lat, n_offsets),
+        np.tile(orthogonal_directions, n_offsets),
+        np.repeat(offsets.ravel(), n_points),
+    )
+    lon = lon.reshape(*offsets.shape, n_points)
+    lat = lat.reshape(*offsets.shape, n_points)
     return lon, lat
 
 
@@ -49,26 +64,15 @@ def get_geodesic_band(
     n_cross_track: int,
 ) -> tuple[np.ndarray, np.ndarray]:
     """Compute coordinates of geodesic band."""
-    lon_lines = []
-    lat_lines = []
     offsets = np.linspace(-width / 2, width / 2, n_cross_track)
-
-    for offset in offsets:
-        lon_line, lat_line = get_geodesic_path(
-            start_lon=start_lon,
-            start_lat=start_lat,
-            end_lon=end_lon,
-            end_lat=end_lat,
-            n_points=n_along_track,
-            offset_distance=offset,
-        )
-        lon_lines.append(lon_line)
-        lat_lines.append(lat_line)
-
-    lon = np.stack(lon_lines)
-    lat = np.stack(lat_lines)
-
-    return lon, lat
+    return get_geodesic_path(
+        start_lon=start_lon,
+        start_lat=start_lat,
+        end_lon=end_lon,
+        end_lat=end_lat,
+        n_points=n_along_track,
+        offset_distance=offsets,
+    )
 
 
 def get_orbit_dataarray(
@@ -87,7 +91,7 @@ def get_orbit_dataarray(
     granule_id = np.zeros(n_along_track, dtype=int)
     cross_track_id = np.arange(0, n_cross_track)
     along_track_id = np.arange(0, n_along_track)
-    gpm_id = [str(g) + "-" + str(z) for g, z in zip(granule_id, along_track_id, strict=False)]
+    gpm_id = np.char.add(np.char.add(granule_id.astype(str), "-"), along_track_id.astype(str))
     timesteps = pd.date_range("2000-01-01", periods=n_along_track, freq="s")
 
     # Coordinates
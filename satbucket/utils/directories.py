@@ -102,18 +102,19 @@ def match_filters(filename, file_extension=None, glob_pattern=None, regex_patter
 
 def list_and_filter_files(path, file_extension=None, glob_pattern=None, regex_pattern=None, sort=True):
     """Retrieve list of files (filtered by extension and custom patterns)."""
+    # The filename filters are checked first, as is_file() might require a stat call on some file systems
     with os.scandir(path) as file_it:
         filepaths = [
             file_entry.path
             for file_entry in file_it
             if (
-                file_entry.is_file()
-                and match_filters(
+                match_filters(
                     filename=file_entry.name,
                     file_extension=file_extension,
                     glob_pattern=glob_pattern,
                     regex_pattern=regex_pattern,
                 )
+                and file_entry.is_file()
             )
         ]
     if sort:
@@ -261,3 +262,21 @@ def get_first_file(directory):
             if entry.is_file():
                 return entry.path
     return None
+
+
+def get_first_file_within_paths(paths, max_workers=32):
+    """Retrieve filepath of the first file inside the first non-empty directory of a list of directories.
+
+    The directories are scanned concurrently, which hides the listing latency of
+    remote or cold file systems. The directories order is preserved in the search.
+    Returns ``None`` if all directories are empty.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(get_first_file, path) for path in paths]
+        for future in futures:
+            filepath = future.result()
+            if filepath is not None:
+                # Do not scan the remaining directories
+                executor.shutdown(wait=False, cancel_futures=True)
+                return filepath
+    return None
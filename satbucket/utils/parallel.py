@@ -28,6 +28,9 @@
 import itertools
 
 import dask
+from dask.distributed import as_completed
+
+from satbucket.utils.dask import get_client
 
 
 def compute_list_delayed(list_delayed, max_concurrent_tasks=None):
@@ -57,6 +60,56 @@ def compute_list_delayed(list_delayed, max_concurrent_tasks=None):
     return computed_results
 
 
+def compute_as_completed(func, list_kwargs, max_concurrent_tasks, **kwargs):
+    """Execute a function on the Dask Distributed cluster and yield the results as soon as available.
+
+    At most ``max_concurrent_tasks`` tasks are submitted to the scheduler at the same time.
+    A new task is submitted each time a task completes, and the futures are released
+    as soon as their result is retrieved.
+
+    Parameters
+    ----------
+    func : callable
+        Function to execute.
+    list_kwargs : iterable
+        Iterable of dictionaries with the keyword arguments of each task.
+        It is consumed lazily, as the tasks are submitted.
+    max_concurrent_tasks : int
+        Maximum number of tasks submitted at the same time.
+    **kwargs : dict
+        Keyword arguments shared by all tasks.
+
+    Yields
+    ------
+    tuple
+        The task index in ``list_kwargs`` and the task result, in order of completion.
+
+    """
+    client = get_client()
+    iter_tasks = enumerate(list_kwargs)
+
+    def submit_task(task):
+        idx, task_kwargs = task
+        future = client.submit(func, pure=False, **task_kwargs, **kwargs)
+        dict_futures[future] = idx
+        return future
+
+    # Submit the first tasks
+    dict_futures = {}
+    futures = [submit_task(task) for task in itertools.islice(iter_tasks, max_concurrent_tasks)]
+
+    # Submit a new task each time a task completes
+    completed_futures = as_completed(futures)
+    for future in completed_futures:
+        idx = dict_futures.pop(future)
+        result = future.result()
+        future.release()
+        next_task = next(iter_tasks, None)
+        if next_task is not None:
+            completed_futures.add(submit_task(next_task))
+        yield idx, result
+
+
 def create_group_slices(chunksizes, group_size):
     """
     Create slices by grouping contiguous chunks along a dimension.
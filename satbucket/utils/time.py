@@ -86,21 +86,22 @@ def subset_by_time(xr_obj, start_time=None, end_time=None):
 
     dim_coord = dim_coords[0]
 
-    # Subset by start_time
+    # Define the timesteps to keep
+    # - A single boolean mask is computed on the numpy time array and applied once
+    timesteps = xr_obj["time"].to_numpy()
+    isel_bool = np.ones(timesteps.shape, dtype=bool)
     if start_time is not None:
-        isel_bool = xr_obj["time"] >= pd.Timestamp(start_time)
+        isel_bool &= timesteps >= np.datetime64(start_time)
         if not np.any(isel_bool):
             raise ValueError(f"No timesteps to return with start_time {start_time}.")
-        isel_dict = {dim_coord: isel_bool}
-        xr_obj = xr_obj.isel(isel_dict)
-
-    # Subset by end_time
     if end_time is not None:
-        isel_bool = xr_obj["time"] <= pd.Timestamp(end_time)
+        isel_bool &= timesteps <= np.datetime64(end_time)
         if not np.any(isel_bool):
             raise ValueError(f"No timesteps to return with end_time {end_time}.")
-        isel_dict = {dim_coord: isel_bool}
-        xr_obj = xr_obj.isel(isel_dict)
+
+    # Subset by time
+    if not np.all(isel_bool):
+        xr_obj = xr_obj.isel({dim_coord: isel_bool})
 
     return xr_obj
 
@@ -121,6 +122,10 @@ def is_nat(timesteps):
     """Return a boolean array indicating timesteps which are NaT."""
     # pd.isnull(np.datetime64('NaT'))
     # pd.isna(np.datetime64('NaT'))
+    # - datetime64 arrays are checked directly with numpy (without pandas dtype inference)
+    timesteps_arr = np.asarray(timesteps)
+    if timesteps_arr.dtype.kind in "Mm":
+        return np.isnat(timesteps_arr)
     return pd.isna(timesteps)
 
 
@@ -129,6 +134,28 @@ def has_nat(timesteps):
     return np.any(is_nat(timesteps))
 
 
+def _interpolate_linear_forward(values, limit=None, limit_area=None):
+    """Linearly interpolate NaN values as ``pandas.Series.interpolate(limit_direction='forward')``."""
+    is_missing = np.isnan(values)
+    if not np.any(is_missing) or np.all(is_missing):
+        return values
+    indices = np.arange(len(values))
+    valid_indices = indices[~is_missing]
+    # Identify the NaN values to fill
+    # - Leading NaNs are not filled when interpolating forward
+    # - Trailing NaNs are filled with the last valid value unless limit_area="inside"
+    to_fill = is_missing & (indices > valid_indices[0])
+    if limit_area == "inside":
+        to_fill &= indices < valid_indices[-1]
+    # Fill only the first <limit> NaNs of each consecutive NaN sequence
+    if limit is not None:
+        last_valid_indices = np.maximum.accumulate(np.where(is_missing, 0, indices))
+        to_fill &= (indices - last_valid_indices) <= limit
+    values = values.copy()
+    values[to_fill] = np.interp(indices[to_fill], valid_indices, values[~is_missing])
+    return values
+
+
 def interpolate_nat(timesteps, method="linear", limit=5, limit_direction=None, limit_area=None):
     """Fill NaT values using an interpolation method.
 
@@ -170,6 +197,10 @@ def interpolate_nat(timesteps, method="linear", limit=5, limit_direction=None, l
     timesteps_num = timesteps.astype(float)
     # Convert NaT to np.nan
     timesteps_num[is_nat(timesteps)] = np.nan
+    # Linearly interpolate NaT with numpy
+    if method == "linear" and limit_direction in (None, "forward") and limit_area in (None, "inside"):
+        timesteps_num = _interpolate_linear_forward(timesteps_num, limit=limit, limit_area=limit_area)
+        return timesteps_num.astype(timesteps_dtype)
     # Create pd.Series
     series = pd.Series(timesteps_num)
     # Estimate NaT value
@@ -255,19 +286,22 @@ def get_dataset_start_end_time(ds: xr.Dataset, time_dim="time"):
 
 def _define_fill_value(ds, fill_value):
     fill_value = {}
-    for var in ds.data_vars:
-        if np.issubdtype(ds[var].dtype, np.floating):
+    for var, da in ds.data_vars.items():
+        # Classify the variable by its dtype kind (float: "f", signed/unsigned integer: "i"/"u")
+        dtype_kind = da.dtype.kind
+        if dtype_kind == "f":
             fill_value[var] = dtypes.NA
-        elif np.issubdtype(ds[var].dtype, np.integer):
-            if "_FillValue" in ds[var].attrs:
-                fill_value[var] = ds[var].attrs["_FillValue"]
+        elif dtype_kind in "iu":
+            if "_FillValue" in da.attrs:
+                fill_value[var] = da.attrs["_FillValue"]
             else:
-                fill_value[var] = np.iinfo(ds[var].dtype).max
+                fill_value[var] = np.iinfo(da.dtype).max
     return fill_value
 
 
 def _check_time_sorted(ds, time_dim):
-    time_diff = np.diff(ds[time_dim].data.astype(int))
+    # Compute the time differences on the int64 view of the datetime64 values (without copying them)
+    time_diff = np.diff(ds[time_dim].to_numpy().view("i8"))
     if np.any(time_diff == 0):
         raise ValueError(f"In the {time_dim} dimension there are duplicated timesteps !")
     if not np.all(time_diff > 0):
@@ -311,6 +345,15 @@ def regularize_dataset(
 
     """
     ds = _check_time_sorted(ds, time_dim=time_dim)
+
+    # Return the dataset if the timesteps are already regular at the requested frequency
+    # - Only fixed frequencies (i.e. "2min") can be checked with the timesteps differences
+    offset = pd.tseries.frequencies.to_offset(freq)
+    if isinstance(offset, pd.offsets.Tick):
+        time_diff = np.diff(ds[time_dim].to_numpy())
+        if np.all(time_diff == np.timedelta64(offset.nanos, "ns")):
+            return ds
+
     start_time, end_time = get_dataset_start_end_time(ds, time_dim=time_dim)
     new_time_index = pd.date_range(
         start=pd.to_datetime(start_time),
@@ -142,6 +142,43 @@ def write_dataset_metadata(base_dir, metadata_collector, schema):
     )
 
 
+def get_table_schema(df):
+    """Return the pyarrow schema of a pandas, dask, polars or pyarrow DataFrame."""
+    if isinstance(df, pa.Table):
+        return df.schema
+    if isinstance(df, dd.DataFrame):
+        return pa.Schema.from_pandas(df._meta, preserve_index=False)
+    if isinstance(df, pl.DataFrame):
+        return df.head(0).to_arrow().schema
+    return pa.Schema.from_pandas(df, preserve_index=False)
+
+
+def get_byte_stream_split_columns(df, use_byte_stream_split=False):
+    """Define the columns to be encoded with BYTE_STREAM_SPLIT.
+
+    If ``use_byte_stream_split=True``, all floating point columns are encoded with BYTE_STREAM_SPLIT.
+    The encoding does not support the other column types (i.e. strings and booleans).
+    """
+    if use_byte_stream_split is not True:
+        return use_byte_stream_split
+    schema = get_table_schema(df)
+    columns = [field.name for field in schema if pa.types.is_floating(field.type)]
+    return columns if len(columns) > 0 else False
+
+
+def get_dictionary_encoded_columns(df, use_byte_stream_split=False):
+    """Define the ``use_dictionary`` Parquet option excluding the BYTE_STREAM_SPLIT encoded columns.
+
+    The dictionary encoding takes precedence over the BYTE_STREAM_SPLIT encoding,
+    so the columns to be encoded with BYTE_STREAM_SPLIT must not be dictionary-encoded.
+    """
+    use_byte_stream_split = get_byte_stream_split_columns(df, use_byte_stream_split=use_byte_stream_split)
+    if not use_byte_stream_split:
+        return True
+    columns = get_table_schema(df).names
+    return [column for column in columns if column not in use_byte_stream_split]
+
+
 def preprocess_writer_kwargs(writer_kwargs, df):
     # https://arrow.apache.org/docs/python/generated/pyarrow.dataset.write_dataset.html
 
@@ -192,10 +229,19 @@ def preprocess_writer_kwargs(writer_kwargs, df):
         compression = writer_kwargs.pop("compression", None)
         compression_level = writer_kwargs.pop("compression_level", None)
         write_statistics = writer_kwargs.pop("write_statistics", False)
+        use_byte_stream_split = writer_kwargs.pop("use_byte_stream_split", False)
+        use_byte_stream_split = get_byte_stream_split_columns(df, use_byte_stream_split=use_byte_stream_split)
+        use_dictionary = writer_kwargs.pop("use_dictionary", None)
+        if use_dictionary is None:
+            use_dictionary = get_dictionary_encoded_columns(df, use_byte_stream_split=use_byte_stream_split)
+        write_page_index = writer_kwargs.pop("write_page_index", False)
         file_options = {}
         file_options["compression"] = compression
         file_options["compression_level"] = compression_level
         file_options["write_statistics"] = write_statistics
+        file_options["use_byte_stream_split"] = use_byte_stream_split
+        file_options["use_dictionary"] = use_dictionary
+        file_options["write_page_index"] = write_page_index
         parquet_format = pa.dataset.ParquetFileFormat()
         file_options = parquet_format.make_write_options(**file_options)
 